@@ -0,0 +1,269 @@
+import numpy as np
+
+from dino import DinoGame, Settings, JUMP, DUCK, FLYING_LIZARD, variants
+
+class BatchDinoGame:
+    '''A class to run many independent dino games at once with NumPy arrays.
+
+    Every game follows the same rules as DinoGame, but the state of all games is
+    held in arrays and advanced together by one vectorized step.
+    '''
+    def __init__(self, num_games, seed=None, settings=None):
+        '''Initialize games, using the geometry of a headless DinoGame.'''
+        self.num_games = num_games
+        self.settings = settings if settings else Settings()
+        self.rng = np.random.default_rng(seed)
+
+        game = DinoGame(headless=True)
+        self._load_trex_geometry(game.trex)
+        self._load_obstacle_geometry(game)
+        self.screen_right = game.screen_rect.right
+        self.milestones = np.array(self.settings.milestones, dtype=np.float64)
+
+        n = num_games
+        # Trex has two rects and only one of them (the current one) moves when jumping.
+        self.default_y = np.empty(n, dtype=np.int32)
+        self.duck_y = np.empty(n, dtype=np.int32)
+        self.rect_duck = np.empty(n, dtype=bool)
+        self.head_y = np.empty(n, dtype=np.int32)
+        self.feet_y = np.empty(n, dtype=np.int32)
+        self.head_duck_y = np.empty(n, dtype=np.int32)
+        self.jump = np.empty(n, dtype=bool)
+        self.reached = np.empty(n, dtype=bool)
+        self.duck = np.empty(n, dtype=bool)
+        self.mod = np.empty(n, dtype=bool)
+
+        # The current obstacle of each game, and the x position of its first entity.
+        self.obstacle = np.empty(n, dtype=np.int64)
+        self.obstacle_x = np.empty(n, dtype=np.int32)
+
+        self.cactus_speed = np.empty(n, dtype=np.int64)
+        self.flying_lizard_speed = np.empty(n, dtype=np.int64)
+        self.points = np.empty(n, dtype=np.float64)
+        self.milestone_point = np.empty(n, dtype=np.int64)
+        self.score = np.empty(n, dtype=np.float64)
+        self.high_score = np.zeros(n, dtype=np.float64)
+        self.frames = np.empty(n, dtype=np.int64)
+
+        # Score and length of the last finished game of each game slot.
+        self.final_score = np.zeros(n, dtype=np.float64)
+        self.final_frames = np.zeros(n, dtype=np.int64)
+
+        self.reset()
+
+    def _load_trex_geometry(self, trex):
+        '''Store positions and hit boxes of trex standing on the ground.'''
+        self.default_ground_y = trex.default_image_rect.y
+        self.duck_ground_y = trex.duck_image_rect.y
+        self.original_y_pos = trex.original_y_pos
+        self.max_jump_height = trex.max_jump_height
+        self.jump_speed = self.settings.trex_jump_speed
+
+        self.head_box = (trex.head_rect.x, trex.head_rect.y, trex.head_rect.width, trex.head_rect.height)
+        self.feet_box = (trex.feet_rect.x, trex.feet_rect.y, trex.feet_rect.width, trex.feet_rect.height)
+        self.head_duck_box = (trex.head_duck_rect.x, trex.head_duck_rect.y,
+                              trex.head_duck_rect.width, trex.head_duck_rect.height)
+        # Offset from the top of the duck rect to the top of the duck hit box.
+        self.head_duck_offset = trex.head_duck_rect.y - trex.duck_image_rect.y
+
+    def _load_obstacle_geometry(self, game):
+        '''Turn the collision masks of the obstacle groups into summed-area tables.'''
+        # The obstacle list repeats groups to weight the random choice. The DinoGame
+        # group of each obstacle in the batch is kept, to play the same games with it.
+        groups = self.groups = list(dict.fromkeys(game.obstacles))
+        weights = np.array([game.obstacles.count(group) for group in groups], dtype=np.float64)
+        self.obstacle_p = weights / weights.sum()
+
+        entities = game.entities
+        rects = [[entities.rect(i) for i in entities.groups[group]] for group in groups]
+
+        # Bounds of every group, relative to the left of its first entity.
+        bounds = []
+        for group_rects in rects:
+            left = group_rects[0].left
+            bounds.append((
+                left,
+                min(rect.top for rect in group_rects),
+                max(rect.right for rect in group_rects) - left,
+                max(rect.bottom for rect in group_rects),
+            ))
+        width = max(bound[2] for bound in bounds)
+        height = max(bound[3] - bound[1] for bound in bounds)
+
+        self.obstacle_is_lizard = np.zeros(len(groups), dtype=bool)
+        self.obstacle_right = np.zeros(len(groups), dtype=np.int32)
+        self.obstacle_top = np.zeros(len(groups), dtype=np.int32)
+        # table[i, y, x] counts the opaque pixels of group i above y and left of x.
+        self.table = np.zeros((len(groups), height + 1, width + 1), dtype=np.int32)
+        for i, (group, group_rects, (left, top, _, _)) in enumerate(zip(groups, rects, bounds)):
+            rows = entities.groups[group]
+            self.obstacle_is_lizard[i] = entities.kinds[rows[0]] == FLYING_LIZARD
+            self.obstacle_right[i] = group_rects[-1].right - left
+            self.obstacle_top[i] = top
+
+            opaque = np.zeros((height, width), dtype=bool)
+            for row, rect in zip(rows, group_rects):
+                mask = variants.masks[entities.variants[row]]
+                w, h = mask.get_size()
+                pixels = np.array([[mask.get_at((x, y)) for x in range(w)] for y in range(h)], dtype=bool)
+                x, y = rect.left - left, rect.top - top
+                opaque[y:y + h, x:x + w] |= pixels
+            self.table[i, 1:, 1:] = opaque.cumsum(axis=0).cumsum(axis=1)
+
+    def reset(self, mask=None):
+        '''Set or reset the games selected by mask (all by default) to the original state.'''
+        if mask is None:
+            mask = np.ones(self.num_games, dtype=bool)
+        count = int(mask.sum())
+        if not count:
+            return
+
+        self.default_y[mask] = self.default_ground_y
+        self.duck_y[mask] = self.duck_ground_y
+        self.rect_duck[mask] = False
+        self.head_y[mask] = self.head_box[1]
+        self.feet_y[mask] = self.feet_box[1]
+        self.head_duck_y[mask] = self.duck_y[mask] + self.head_duck_offset
+        self.jump[mask] = False
+        self.reached[mask] = False
+        self.duck[mask] = False
+        self.mod[mask] = False
+
+        self.obstacle[mask] = self.rng.choice(len(self.obstacle_p), size=count, p=self.obstacle_p)
+        self.obstacle_x[mask] = self.screen_right
+
+        self.settings.reset_state()
+        self.cactus_speed[mask] = self.settings.cactus_speed
+        self.flying_lizard_speed[mask] = self.settings.flying_lizard_speed
+        self.points[mask] = self.settings.points
+        self.milestone_point[mask] = self.settings.milestone_point
+        self.score[mask] = 0
+        self.frames[mask] = 0
+
+    def step(self, actions):
+        '''Advance every game by one frame, and return which games are over.
+
+        actions is an array of DinoGame actions, one per game. Finished games are
+        reset right away; their results are kept in final_score and final_frames.
+        '''
+        actions = np.asarray(actions)
+        self.jump |= (actions & JUMP) != 0
+        self.duck[:] = (actions & DUCK) != 0
+
+        self._update_obstacle()
+        self._update_trex_jump()
+        self._duck_action()
+        over = self._check_trex_obstacle_collide()
+
+        self.frames += 1
+        if over.any():
+            self.final_score[over] = self.score[over]
+            self.final_frames[over] = self.frames[over]
+            self.reset(over)
+        return over
+
+    def _update_obstacle(self):
+        '''Move obstacles, choose next ones, and update scoring.'''
+        speed = np.where(self.obstacle_is_lizard[self.obstacle], self.flying_lizard_speed, self.cactus_speed)
+        self.obstacle_x -= speed.astype(np.int32)
+
+        # Obstacles that pass the left of the screen go back to the right of the screen,
+        # which is where every obstacle waits until it is chosen.
+        passed = self.obstacle_x + self.obstacle_right[self.obstacle] < 0
+        count = int(passed.sum())
+        if count:
+            self.obstacle_x[passed] = self.screen_right
+            self.obstacle[passed] = self.rng.choice(len(self.obstacle_p), size=count, p=self.obstacle_p)
+
+        self.score += self.points
+        np.maximum(self.high_score, self.score, out=self.high_score)
+        self._check_milestone()
+
+    def _check_milestone(self):
+        '''Increase speed of the games that have reached a milestone.'''
+        reached = self.score >= self.milestones[self.milestone_point]
+        if reached.any():
+            scale = self.settings.speedup_scale
+            self.cactus_speed[reached] = (self.cactus_speed[reached] * scale).astype(np.int64)
+            self.flying_lizard_speed[reached] = (self.flying_lizard_speed[reached] * scale).astype(np.int64)
+            self.points[reached] *= 2
+            self.milestone_point[reached] += 1
+
+    def _update_trex_jump(self):
+        '''Process trex jump.'''
+        jump = self.jump
+        move = np.where(self.reached, -self.jump_speed, self.jump_speed) * jump
+        move = move.astype(np.int32)
+        self.default_y -= move * ~self.rect_duck
+        self.duck_y -= move * self.rect_duck
+        self.head_y -= move
+        self.feet_y -= move
+        self.head_duck_y -= move
+
+        y = np.where(self.rect_duck, self.duck_y, self.default_y)
+        self.reached |= jump & (y <= self.max_jump_height)
+        landed = jump & (y >= self.original_y_pos)
+        self.jump &= ~landed
+        self.reached &= ~landed
+
+    def _duck_action(self):
+        '''Perform duck action.'''
+        on_ground = ~self.jump
+        duck_on_ground = self.duck & on_ground
+        stand_on_ground = ~self.duck & on_ground
+        self.rect_duck |= duck_on_ground
+        self.rect_duck &= ~stand_on_ground
+        self.duck_y[duck_on_ground] = self.duck_ground_y
+        self.default_y[stand_on_ground] = self.default_ground_y
+
+        # Move the duck hit box down while ducking in the air, and back up on the ground.
+        lift = duck_on_ground & self.mod
+        lower = self.duck & self.jump & ~self.mod
+        self.head_duck_y -= (16 * lift).astype(np.int32)
+        self.head_duck_y += (16 * lower).astype(np.int32)
+        self.mod &= ~lift
+        self.mod |= lower
+
+    def _check_trex_obstacle_collide(self):
+        '''Return which games have a collision between trex and obstacle.'''
+        table, obstacle = self.table, self.obstacle
+        height, width = table.shape[1] - 1, table.shape[2] - 1
+        left = self.obstacle_x
+        top = self.obstacle_top[self.obstacle]
+
+        def overlaps(box, box_top):
+            # Count opaque pixels inside the hit box with four lookups in the summed-area table.
+            x, _, box_width, box_height = box
+            x0 = np.clip(x - left, 0, width)
+            x1 = np.clip(x + box_width - left, 0, width)
+            y0 = np.clip(box_top - top, 0, height)
+            y1 = np.clip(box_top + box_height - top, 0, height)
+            count = (table[obstacle, y1, x1] - table[obstacle, y0, x1]
+                     - table[obstacle, y1, x0] + table[obstacle, y0, x0])
+            return count > 0
+
+        standing = overlaps(self.head_box, self.head_y) | overlaps(self.feet_box, self.feet_y)
+        ducking = overlaps(self.head_duck_box, self.head_duck_y)
+        return np.where(self.duck, ducking, standing)
+
+def measure_steps_per_second(num_games=4096, steps=1000, seed=0):
+    '''Run random actions in a batch of games and return game steps per second.'''
+    import time
+
+    batch = BatchDinoGame(num_games, seed=seed)
+    rng = np.random.default_rng(seed)
+    actions = rng.choice((0, JUMP, DUCK), size=(steps, num_games), p=(0.8, 0.15, 0.05))
+    start = time.perf_counter()
+    for step_actions in actions:
+        batch.step(step_actions)
+    return num_games * steps / (time.perf_counter() - start)
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark the batched dino game.')
+    parser.add_argument('--games', type=int, default=4096, help='number of games in the batch')
+    parser.add_argument('--steps', type=int, default=1000, help='number of batch steps')
+    args = parser.parse_args()
+
+    print(f'{measure_steps_per_second(args.games, args.steps):.0f} game steps per second')
@@ -0,0 +1,63 @@
+'''Count the allocations of the frame loop over fixed seeded games, and check them against a budget.
+
+Run from the repository root with: python -m benchmarks.allocations
+ReflexBot plays in place of the player in run_game, without a frame rate limit, with
+an AllocationProfiler counting what each phase and source line allocates. With --budget,
+it exits with an error when any frame made more allocations than that.
+SDL's dummy video driver is used unless SDL_VIDEODRIVER is already set.
+'''
+import os
+import sys
+import argparse
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+from dino import DinoGame, Settings, AllocationProfiler
+from bots import ReflexBot
+
+class Finished(Exception):
+    '''Raised to leave the game loop once enough frames were drawn.'''
+
+def profile(settings, frames, budget=None, seed=0):
+    '''Run the game loop for frames, and return its AllocationProfiler.'''
+    game = DinoGame(settings=settings, seed=seed)
+    game.settings.frame_rate = 0
+    bot = ReflexBot()
+    seeds = iter(range(seed, seed + frames))
+    drawn = 0
+
+    def check_events():
+        '''Let the bot play instead of handling events.'''
+        nonlocal drawn
+        if drawn == frames:
+            raise Finished
+        drawn += 1
+        if not game.game_active:
+            game.reset(next(seeds))
+        game.action = bot.act(game)
+
+    game._check_events = check_events
+    # Everything made while starting is left out, so only frames are counted.
+    game.reset(next(seeds))
+    game.profiler = AllocationProfiler(game, capacity=frames, budget=budget)
+    try:
+        game.run_game()
+    except Finished:
+        pass
+    game.profiler.close()
+    return game.profiler
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Count allocations of the frame loop.')
+    parser.add_argument('--frames', type=int, default=600, help='frames profiled')
+    parser.add_argument('--budget', type=int, help='fail if a frame makes more allocations than this')
+    parser.add_argument('--dirty-rects', action='store_true', help='draw with dirty rects')
+    parser.add_argument('--obstacle-stream', action='store_true', help='bring obstacles as a stream')
+    args = parser.parse_args()
+
+    settings = Settings(obstacle_stream=True) if args.obstacle_stream else Settings()
+    settings.dirty_rects = args.dirty_rects
+    profiler = profile(settings, args.frames, args.budget)
+    print(profiler.report())
+    if profiler.over_budget:
+        sys.exit(1)
@@ -0,0 +1,52 @@
+'''Measure what capturing frames costs the game loop, against saving them in the loop.
+
+Run from the repository root with: python -m benchmarks.capture
+Frames are drawn at the rate given, and the time the loop spends on capture is
+reported along with how many frames the worker had to drop.
+SDL's dummy video driver is used unless SDL_VIDEODRIVER is already set.
+'''
+import os
+import time
+import tempfile
+import argparse
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+from dino import DinoGame
+from bots import ReflexBot
+from capture import Capture
+
+def play(game, frames, fps, save):
+    '''Play frames with ReflexBot at fps, call save with the screen after each, and return its mean milliseconds.'''
+    bot = ReflexBot()
+    clock = pygame.time.Clock()
+    game.reset(0)
+    elapsed = 0
+    for _ in range(frames):
+        if not game.step(bot.act(game)):
+            game.reset(game.seed + 1)
+        game._update_screen()
+        start = time.perf_counter()
+        save(game.screen)
+        elapsed += time.perf_counter() - start
+        clock.tick(fps)
+    return elapsed / frames * 1e3
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure the cost of capturing frames.')
+    parser.add_argument('--frames', type=int, default=300, help='frames played each way')
+    parser.add_argument('--fps', type=int, default=60, help='frames drawn per second')
+    args = parser.parse_args()
+
+    game = DinoGame()
+    with tempfile.TemporaryDirectory() as directory:
+        paths = (os.path.join(directory, f'{i:06}.png') for i in range(args.frames))
+        inline = play(game, args.frames, args.fps, lambda screen: pygame.image.save(screen, next(paths)))
+        print(f'pygame.image.save in the loop: {inline:.3f} ms per frame')
+
+        capture = Capture(game.screen, os.path.join(directory, 'capture'))
+        pooled = play(game, args.frames, args.fps, capture.add)
+        capture.close()
+        print(f'Capture: {pooled:.3f} ms per frame, {capture.summary()}')
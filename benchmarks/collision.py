@@ -0,0 +1,88 @@
+'''Compare the mask collision check with the collide point check it replaced.
+
+Run from the repository root with: python -m benchmarks.collision
+'''
+import time
+import random
+
+from dino import DinoGame, CACTUS, FLYING_LIZARD
+
+def legacy_collide(game):
+    '''Collision check of the game before masks, using three points per obstacle entity.'''
+    collide = False
+    collide_dict = {CACTUS: [], FLYING_LIZARD: []}
+    entities = game.entities
+    for i in entities.groups[game.obstacle]:
+        rect = entities.rect(i)
+        scale = rect.width / 80
+        if entities.kinds[i] == CACTUS:
+            collide_dict[CACTUS].append((rect.centerx, rect.centery - int(35 * scale)))
+            collide_dict[CACTUS].append((rect.centerx - int(13 * scale), rect.centery - int(22 * scale)))
+            collide_dict[CACTUS].append((rect.centerx, rect.centery + int(10 * scale)))
+        elif entities.kinds[i] == FLYING_LIZARD:
+            collide_dict[FLYING_LIZARD].append((rect.centerx - 28, rect.centery - 16))
+            collide_dict[FLYING_LIZARD].append((rect.centerx - 6, rect.centery + 15))
+            collide_dict[FLYING_LIZARD].append((rect.centerx + 26, rect.centery - 2))
+
+        for type in collide_dict:
+            for collide_point in collide_dict[type]:
+                if not game.trex.duck:
+                    if game.trex.head_rect.collidepoint(collide_point):
+                        collide = True
+                    elif game.trex.feet_rect.collidepoint(collide_point):
+                        collide = True
+                elif game.trex.head_duck_rect.collidepoint(collide_point):
+                    collide = True
+    return collide
+
+def mask_collide(game):
+    '''Run the collision check of the game, and return whether trex collided.'''
+    game.game_active = True
+    game._check_trex_obstacle_collide()
+    return not game.game_active
+
+def scenarios(game, seed=0):
+    '''Yield game states covering every obstacle at every position and trex pose.'''
+    rng = random.Random(seed)
+    xs = game.entities.xs
+    for group in range(game.patterns):
+        game.obstacle = group
+        rows = game.entities.groups[group]
+        offsets = [xs[i] - xs[rows[0]] for i in rows]
+        for left in range(-200, 200, 3):
+            for i, offset in zip(rows, offsets):
+                xs[i] = left + offset
+            for lift in range(0, 180, 20):
+                game.trex.reset_state()
+                game.trex.duck = rng.random() < 0.3
+                for rect in (game.trex.head_rect, game.trex.feet_rect, game.trex.head_duck_rect):
+                    rect.y -= lift
+                yield
+        for i in rows:
+            xs[i] = game.start_xs[i]
+
+def measure(check, game, repeat=20):
+    '''Return the mean time of check over all scenarios in microseconds, and its results.'''
+    states = 0
+    results = []
+    elapsed = 0
+    for _ in scenarios(game):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            collide = check(game)
+        elapsed += time.perf_counter() - start
+        states += 1
+        results.append(collide)
+    return elapsed / (states * repeat) * 1e6, results
+
+if __name__ == '__main__':
+    game = DinoGame(headless=True)
+    legacy_time, legacy_results = measure(legacy_collide, game)
+    mask_time, mask_results = measure(mask_collide, game)
+
+    missed = sum(mask and not legacy for legacy, mask in zip(legacy_results, mask_results))
+    false = sum(legacy and not mask for legacy, mask in zip(legacy_results, mask_results))
+    print(f'collide points: {legacy_time:.2f} us per check')
+    print(f'masks:          {mask_time:.2f} us per check')
+    print(f'{len(mask_results)} states, {sum(mask_results)} collisions, '
+          f'{missed} missed and {false} false by collide points')
@@ -0,0 +1,59 @@
+'''Measure the time to draw a frame at night, from inverted images made once, against inverting every frame.
+
+Run from the repository root with: python -m benchmarks.daynight
+Night frames are drawn with the inverted copies of the images, frames while fading blend
+the normal and the inverted frame, and the alternative draws the normal frame and then
+inverts the whole screen with surfarray. SDL's dummy video driver is used unless
+SDL_VIDEODRIVER is already set.
+'''
+import os
+import time
+import argparse
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+from dino import DinoGame, Settings
+from bots import ReflexBot
+
+def measure(night, fading, invert_screen, dirty_rects=False, frames=300, seed=0):
+    '''Play frames of a game with day_night, and return the mean time of drawing a frame in milliseconds.
+
+    With fading, the fade is held halfway. With invert_screen, a day frame is drawn and then inverted.
+    '''
+    game = DinoGame(settings=Settings(day_night=True, fade_frames=2), seed=seed)
+    game.settings.dirty_rects = dirty_rects
+    game.reset(seed)
+    bot = ReflexBot()
+
+    elapsed = 0
+    for _ in range(frames):
+        if not game.step(bot.act(game)):
+            game.reset(game.seed + 1)
+        game.settings.milestone_point = 1 if night else 0
+        if fading:
+            game.fade_frame = 0
+        start = time.perf_counter()
+        game._update_screen()
+        if invert_screen:
+            pixels = pygame.surfarray.pixels3d(game.screen)
+            pixels[:] = 255 - pixels
+            del pixels
+        elapsed += time.perf_counter() - start
+    return elapsed / frames * 1e3
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure drawing frames with inverted colors.')
+    parser.add_argument('--frames', type=int, default=300, help='frames per measurement')
+    args = parser.parse_args()
+
+    day = measure(False, False, False, frames=args.frames)
+    night = measure(True, False, False, frames=args.frames)
+    fading = measure(True, True, False, frames=args.frames)
+    inverted = measure(False, False, True, frames=args.frames)
+    dirty_day = measure(False, False, False, True, args.frames)
+    dirty_night = measure(True, False, False, True, args.frames)
+    print(f'day {day:.3f} ms, night {night:.3f} ms, fading {fading:.3f} ms per frame')
+    print(f'day inverted with surfarray every frame {inverted:.3f} ms per frame')
+    print(f'dirty rects: day {dirty_day:.3f} ms, night {dirty_night:.3f} ms per frame')
@@ -0,0 +1,45 @@
+'''Compare playing games step by step with fast-forwarding over the steps where nothing happens.
+
+Run from the repository root with: python -m benchmarks.fastforward
+Both ways play the same games with ReflexBot, fast-forwarding within the bot's margin,
+and must end with exactly the same scores.
+'''
+import time
+import argparse
+
+from dino import DinoGame, NOOP
+from bots import ReflexBot
+
+def play(game, seeds, fast_forward, max_steps=20000):
+    '''Play one game per seed, and return the final scores and the seconds it took.'''
+    bot = ReflexBot()
+    scores = []
+    start = time.perf_counter()
+    for seed in seeds:
+        game.reset(seed)
+        steps = 0
+        while game.game_active and steps < max_steps:
+            action = bot.act(game)
+            if fast_forward and action == NOOP:
+                played = game.fast_forward(max_steps - steps, bot.margin(game))
+                if played:
+                    steps += played
+                    continue
+            game.step(action)
+            steps += 1
+        scores.append(game.scoreboard.score)
+    return scores, time.perf_counter() - start
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure the speedup of fast-forwarding.')
+    parser.add_argument('--games', type=int, default=20, help='number of games played each way')
+    parser.add_argument('--max-steps', type=int, default=20000, help='step limit of one game')
+    args = parser.parse_args()
+
+    game = DinoGame(headless=True)
+    seeds = range(args.games)
+    step_scores, step_time = play(game, seeds, False, args.max_steps)
+    forward_scores, forward_time = play(game, seeds, True, args.max_steps)
+    assert step_scores == forward_scores, 'fast-forwarding changed the scores'
+    print(f'step by step: {step_time:.3f} s')
+    print(f'fast-forward: {forward_time:.3f} s ({step_time / forward_time:.1f}x faster), same scores')
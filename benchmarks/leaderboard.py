@@ -0,0 +1,52 @@
+'''Measure what the leaderboard costs the game, with a database of many games.
+
+Run from the repository root with: python -m benchmarks.leaderboard
+A temporary database is filled with games of many players, then the time to open
+it, which reads the top scores and the player's best, and the time add() takes in
+the game loop are reported, along with how fast queued games are written.
+'''
+import os
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+
+from leaderboard import Leaderboard, SCHEMA
+
+def fill(path, games, players, seed=0):
+    '''Write games of players with random scores spread over a year into the database at path.'''
+    rng = random.Random(seed)
+    now = time.time()
+    connection = sqlite3.connect(path)
+    connection.executescript(SCHEMA)
+    with connection:
+        connection.executemany(
+            'INSERT INTO runs (player, score, seed, played_at) VALUES (?, ?, ?, ?)',
+            ((f'player{rng.randrange(players)}', rng.expovariate(1 / 500), rng.getrandbits(32),
+              now - rng.uniform(0, 365 * 86400)) for _ in range(games)))
+    connection.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure the leaderboard.')
+    parser.add_argument('--games', type=int, default=100000, help='games in the database')
+    parser.add_argument('--players', type=int, default=1000, help='players of those games')
+    parser.add_argument('--adds', type=int, default=1000, help='games added while measuring')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'leaderboard.db')
+        fill(path, args.games, args.players)
+
+        start = time.perf_counter()
+        leaderboard = Leaderboard(path, 'player0')
+        print(f'open with {args.games} games: {(time.perf_counter() - start) * 1e3:.2f} ms')
+
+        start = time.perf_counter()
+        for i in range(args.adds):
+            leaderboard.add(i, i)
+        added = time.perf_counter()
+        leaderboard.close()
+        closed = time.perf_counter()
+        print(f'add: {(added - start) / args.adds * 1e6:.2f} us per game in the game loop')
+        print(f'written: {args.adds / (closed - start):.0f} games per second, in the background')
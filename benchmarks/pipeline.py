@@ -0,0 +1,70 @@
+'''Compare frame times of the serial game loop with the pipelined one, see pipeline.py.
+
+Run from the repository root with: python -m benchmarks.pipeline
+ReflexBot plays in place of the player in both loops, which run for a number of frames
+at a frame rate limit and with none, at several screen sizes. Jitter is the standard
+deviation of frame times. SDL's dummy video driver is used unless SDL_VIDEODRIVER is
+already set, so presenting to a real display is not included.
+'''
+import os
+import time
+import argparse
+import statistics
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+from dino import DinoGame, Settings, FrameProfiler
+from bots import ReflexBot
+from pipeline import Pipeline
+
+class Finished(Exception):
+    '''Raised to leave the game loop once enough frames were drawn.'''
+
+def play(settings, pipelined, frames, fps, seed=0):
+    '''Run a game loop for frames, and return frames per second, p50 and p99 frame time and jitter in milliseconds.'''
+    game = DinoGame(settings=settings, seed=seed)
+    game.settings.frame_rate = fps
+    game.profiler = FrameProfiler(game, capacity=frames)
+    bot = ReflexBot()
+    seeds = iter(range(seed, seed + frames))
+    drawn = 0
+
+    def check_events():
+        '''Let the bot play the game shown instead of handling events.'''
+        nonlocal drawn
+        if drawn == frames:
+            raise Finished
+        drawn += 1
+        if not game.game_active:
+            game.reset(next(seeds))
+        game.action = bot.act(game)
+
+    game._check_events = check_events
+    # Creating the simulation's game is startup, not frame time.
+    pipeline = Pipeline(game) if pipelined else None
+    start = time.perf_counter()
+    try:
+        if pipeline:
+            pipeline.run()
+        else:
+            game.run_game()
+    except Finished:
+        pass
+    elapsed = time.perf_counter() - start
+
+    times = sorted(game.profiler._recent(game.profiler.frame_times))
+    p50, p99, _, _ = game.profiler.stats()
+    return len(times) / elapsed, p50, p99, statistics.pstdev(times) * 1e3
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure frame times of the serial and pipelined loops.')
+    parser.add_argument('--frames', type=int, default=600, help='frames per measurement')
+    args = parser.parse_args()
+
+    for width, height in ((800, 450), (1920, 1080)):
+        for fps in (60, 0):
+            print(f'{width}x{height}, ' + (f'{fps} fps limit:' if fps else 'no limit:'))
+            for name, pipelined in (('serial', False), ('pipelined', True)):
+                settings = Settings(screen_width=width, screen_height=height)
+                rate, p50, p99, jitter = play(settings, pipelined, args.frames, fps)
+                print(f'  {name:9} {rate:7.1f} fps, p50 {p50:6.2f} ms, p99 {p99:6.2f} ms, jitter {jitter:5.2f} ms')
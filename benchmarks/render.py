@@ -0,0 +1,42 @@
+'''Measure the time to draw one frame with full redraws and with dirty rects.
+
+Run from the repository root with: python -m benchmarks.render
+SDL's dummy video driver is used unless SDL_VIDEODRIVER is already set, so
+the time spent by a real display on flip() and update() is not included.
+'''
+import os
+import time
+import argparse
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+from dino import DinoGame, Settings
+from bots import ReflexBot
+
+SIZES = ((800, 450), (1920, 1080), (3840, 2160))
+
+def measure(settings, dirty_rects, frames=300, seed=0):
+    '''Play frames of a game with settings and return the mean time of _update_screen in milliseconds.'''
+    game = DinoGame(settings=settings, seed=seed)
+    game.settings.dirty_rects = dirty_rects
+    game.reset(seed)
+    bot = ReflexBot()
+
+    elapsed = 0
+    for _ in range(frames):
+        if not game.step(bot.act(game)):
+            game.reset(game.seed + 1)
+        start = time.perf_counter()
+        game._update_screen()
+        elapsed += time.perf_counter() - start
+    return elapsed / frames * 1e3
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure frame drawing time.')
+    parser.add_argument('--frames', type=int, default=300, help='frames per measurement')
+    args = parser.parse_args()
+
+    for width, height in SIZES:
+        full = measure(Settings(screen_width=width, screen_height=height), False, args.frames)
+        dirty = measure(Settings(screen_width=width, screen_height=height), True, args.frames)
+        print(f'{width}x{height}: full {full:.3f} ms, dirty rects {dirty:.3f} ms per frame')
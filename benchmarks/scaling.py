@@ -0,0 +1,47 @@
+'''Measure the time to show a frame in large windows, drawn at the window's size or scaled to it.
+
+Run from the repository root with: python -m benchmarks.scaling
+For each window size, the game is drawn natively at that size, and drawn at its own
+800x450 and scaled by each scale mode, with full redraws and with dirty rects. In the
+'gpu' mode SDL scales while presenting. SDL's dummy video driver is used unless
+SDL_VIDEODRIVER is already set, and it has no GPU to scale with, nor a real display,
+so there the 'gpu' mode is scaled by SDL's software renderer.
+'''
+import os
+import argparse
+import warnings
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+# SDL falling back to its software renderer is expected here, and said above.
+warnings.filterwarnings('ignore', 'no fast renderer')
+
+import pygame
+
+from dino import Settings
+from benchmarks.render import SIZES, measure
+
+def measure_scaled(window_size, scale_mode, dirty_rects, frames=300, seed=0):
+    '''Play frames of a game shown in a window of window_size, and return the mean time of _update_screen in milliseconds.'''
+    settings = Settings()
+    settings.window_size = window_size
+    settings.scale_mode = scale_mode
+    elapsed = measure(settings, dirty_rects, frames, seed)
+    if pygame.display.get_window_size() != window_size:
+        raise RuntimeError(f'{scale_mode} opened a window of {pygame.display.get_window_size()}, not {window_size}')
+    return elapsed
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure showing frames in large windows.')
+    parser.add_argument('--frames', type=int, default=300, help='frames per measurement')
+    args = parser.parse_args()
+
+    for width, height in SIZES[1:]:
+        print(f'{width}x{height}:')
+        for dirty_rects in (False, True):
+            name = 'dirty rects' if dirty_rects else 'full'
+            native = measure(Settings(screen_width=width, screen_height=height), dirty_rects, args.frames)
+            print(f'  {name:11} native {native:7.3f} ms', end='')
+            for scale_mode in ('gpu', 'fit', 'integer', 'stretch'):
+                scaled = measure_scaled((width, height), scale_mode, dirty_rects, args.frames)
+                print(f', {scale_mode} {scaled:7.3f} ms', end='')
+            print()
@@ -0,0 +1,61 @@
+'''Measure the time to snapshot and restore the state of a game, and of a lookahead decision.
+
+Run from the repository root with: python -m benchmarks.snapshot
+'''
+import time
+
+from dino import DinoGame
+from bots import ReflexBot, LookaheadBot
+
+def states(game, seed=0, count=200):
+    '''Yield count states of a game played by ReflexBot, one every 5 steps.'''
+    bot = ReflexBot()
+    game.reset(seed)
+    for _ in range(count):
+        for _ in range(5):
+            if not game.step(bot.act(game)):
+                game.reset(game.seed + 1)
+        yield
+
+def measure(game, repeat=100):
+    '''Return mean microseconds of snapshot, restore and step over many states of game.'''
+    snapshot = restore = step = 0
+    calls = 0
+    perf_counter = time.perf_counter
+    for _ in states(game):
+        start = perf_counter()
+        for _ in range(repeat):
+            state = game.snapshot()
+        snapshot += perf_counter() - start
+
+        start = perf_counter()
+        for _ in range(repeat):
+            game.restore(state)
+        restore += perf_counter() - start
+
+        start = perf_counter()
+        for _ in range(repeat):
+            game.step()
+            game.restore(state)
+        step += perf_counter() - start
+        calls += repeat
+    return snapshot / calls * 1e6, restore / calls * 1e6, step / calls * 1e6 - restore / calls * 1e6
+
+def measure_lookahead(game, steps=500, horizon=20):
+    '''Return mean milliseconds of a LookaheadBot decision, and rollouts per decision.'''
+    bot = LookaheadBot(horizon)
+    game.reset(0)
+    start = time.perf_counter()
+    for _ in range(steps):
+        if not game.step(bot.act(game)):
+            game.reset(game.seed + 1)
+    return (time.perf_counter() - start) / steps * 1e3, bot.rollouts / steps
+
+if __name__ == '__main__':
+    game = DinoGame(headless=True)
+    snapshot, restore, step = measure(game)
+    print(f'snapshot: {snapshot:.2f} us')
+    print(f'restore:  {restore:.2f} us')
+    print(f'step:     {step:.2f} us, for comparison')
+    decision, rollouts = measure_lookahead(game)
+    print(f'lookahead decision: {decision:.2f} ms, {rollouts:.1f} rollouts of 20 steps')
@@ -0,0 +1,48 @@
+'''Compare the time to the first frame with and without the asset bundle.
+
+Run from the repository root with: python -m benchmarks.startup
+Each run starts a new process, so nothing is cached by Python or pygame, but the
+files read are likely in the cache of the operating system.
+SDL's dummy video driver is used unless SDL_VIDEODRIVER is already set.
+'''
+import os
+import re
+import sys
+import argparse
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def time_startup(*flags):
+    '''Start the game in a new process, and return milliseconds to the first frame and creating the game.'''
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT='1')
+    env.setdefault('SDL_VIDEODRIVER', 'dummy')
+    output = subprocess.run([sys.executable, str(ROOT / 'dino.py'), '--time-startup', *flags],
+                            env=env, capture_output=True, text=True, check=True).stdout
+    first_frame, game = re.search(r'after ([\d.]+) ms, ([\d.]+) ms', output).groups()
+    return float(first_frame), float(game)
+
+def median(values):
+    '''Return the median of values.'''
+    values = sorted(values)
+    return values[len(values) // 2]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure the time to the first frame.')
+    parser.add_argument('--runs', type=int, default=10, help='processes started per measurement')
+    args = parser.parse_args()
+
+    if not (ROOT / 'assets.bundle').exists():
+        subprocess.run([sys.executable, str(ROOT / 'dino.py'), '--build-bundle'], check=True,
+                       env=dict(os.environ, SDL_VIDEODRIVER='dummy'), stdout=subprocess.DEVNULL)
+
+    # Runs with and without the bundle alternate, so both see the same conditions.
+    times = {'png': [], 'bundle': []}
+    for _ in range(args.runs):
+        times['png'].append(time_startup('--no-bundle'))
+        times['bundle'].append(time_startup())
+
+    for name, results in times.items():
+        print(f'{name:6}: first frame after {median(r[0] for r in results):.1f} ms, '
+              f'creating the game {median(r[1] for r in results):.1f} ms (median of {args.runs})')
@@ -0,0 +1,49 @@
+'''Check that the obstacle stream costs the same per step however long a run lasts.
+
+Run from the repository root with: python -m benchmarks.stream
+ReflexBot plays headless games back to back, one obstacle at a time and as a stream,
+and the time per step and the memory allocated since the start are reported every
+window of steps. Both should stay flat, as the stream only recycles pooled obstacles.
+'''
+import time
+import argparse
+import tracemalloc
+
+from dino import DinoGame, Settings
+from bots import ReflexBot
+
+def play(game, steps, window, measure):
+    '''Play steps with ReflexBot, restarting games, and return what measure gives after every window of steps.'''
+    bot = ReflexBot()
+    results = []
+    seed = 0
+    game.reset(seed)
+    start = measure()
+    for step in range(1, steps + 1):
+        if not game.step(bot.act(game)):
+            seed += 1
+            game.reset(seed)
+        if step % window == 0:
+            end = measure()
+            results.append(end - start)
+            start = end
+    return results
+
+def allocated():
+    '''Return the bytes allocated by Python and still in use.'''
+    return tracemalloc.get_traced_memory()[0]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure the obstacle stream over long runs.')
+    parser.add_argument('--steps', type=int, default=100000, help='steps played each way')
+    parser.add_argument('--window', type=int, default=20000, help='steps between reports')
+    args = parser.parse_args()
+
+    for name, settings in (('classic', Settings()), ('stream', Settings(obstacle_stream=True))):
+        game = DinoGame(headless=True, settings=settings)
+        times = play(game, args.steps, args.window, time.perf_counter)
+        tracemalloc.start()
+        growth = play(game, args.steps, args.window, allocated)
+        tracemalloc.stop()
+        print(f'{name}: us per step ' + ' '.join(f'{t / args.window * 1e6:.2f}' for t in times)
+              + ', bytes allocated per window ' + ' '.join(f'{g:+}' for g in growth))
@@ -0,0 +1,153 @@
+'''Time each hot path of the frame loop over fixed seeded games, and catch regressions.
+
+Run from the repository root with: python -m benchmarks.suite
+Save the results as the baseline with --save-baseline, and later runs compared
+against it with --baseline fail when a path got slower than the threshold allows.
+SDL's dummy video driver is used unless SDL_VIDEODRIVER is already set.
+'''
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+from dino import DinoGame, JUMP, DUCK
+from bots import ReflexBot
+
+SEEDS = (0, 1, 2, 3, 4)
+BASELINE = 'benchmarks/baseline.json'
+
+def play(game, seeds, frames, timings, render=False):
+    '''Play one game per seed with ReflexBot, adding the time of each part of every frame to timings.
+
+    Without render, the parts of _update_game are called one by one in the same
+    order, so the game plays exactly as it would otherwise. With render, each step
+    is followed by drawing the frame half way between it and the step before.
+    '''
+    perf_counter = time.perf_counter
+    bot = ReflexBot()
+
+    def timed(name, function, *args):
+        start = perf_counter()
+        function(*args)
+        timings.setdefault(name, []).append(perf_counter() - start)
+
+    for seed in seeds:
+        if render:
+            game.reset(seed)
+        else:
+            # Starting a game, as a replay does, is timed headlessly only.
+            timed('reset', game.reset, seed)
+        for _ in range(frames):
+            if not game.game_active:
+                break
+            start = perf_counter()
+            action = bot.act(game)
+            if render:
+                game.positions = game._positions()
+                game.step(action)
+                timed('_update_screen', game._update_screen, 0.5)
+                timings.setdefault('frame', []).append(perf_counter() - start)
+                continue
+
+            if action & JUMP:
+                game.trex.jump = True
+            game.trex.duck = bool(action & DUCK)
+            timed('_update_background', game._update_background)
+            timed('_update_obstacle', game._update_obstacle)
+            # Headless games skip drawing the score, so it is timed on its own.
+            timed('prepare_score', game.scoreboard.prepare_score)
+            game._update_trex_jump()
+            game.trex.duck_action()
+            timed('_check_trex_obstacle_collide', game._check_trex_obstacle_collide)
+            timings.setdefault('step', []).append(perf_counter() - start)
+
+def run_suite(rounds=5, frames=300, seeds=SEEDS):
+    '''Run all benchmarks and return the mean time per call of each in microseconds.
+
+    Each benchmark keeps its fastest round, which is the least disturbed by the rest of the system.
+    '''
+    # Simulation is timed headlessly, as bulk simulation runs it, and drawing
+    # in a window of the dummy video driver, as the game is played.
+    sim_game = DinoGame(headless=True)
+    window_game = DinoGame()
+
+    results = {}
+    for _ in range(rounds):
+        timings = {}
+        play(sim_game, seeds, frames, timings)
+        play(window_game, seeds, frames, timings, render=True)
+        # Starting a game puts its obstacles in an order chosen by its seed.
+        for seed in seeds:
+            start = time.perf_counter()
+            sim_game.rng.seed(seed)
+            sim_game._order_obstacles()
+            timings.setdefault('_order_obstacles', []).append(time.perf_counter() - start)
+
+        for name, times in timings.items():
+            mean = sum(times) / len(times) * 1e6
+            if name not in results or mean < results[name]['mean_us']:
+                results[name] = {'mean_us': mean, 'calls': len(times)}
+    return dict(sorted(results.items()))
+
+def compare(results, baseline, threshold):
+    '''Return the names of benchmarks more than threshold slower than baseline, with their ratios.'''
+    regressions = {}
+    for name, result in results.items():
+        if name in baseline:
+            ratio = result['mean_us'] / baseline[name]['mean_us']
+            if ratio > 1 + threshold:
+                regressions[name] = ratio
+    return regressions
+
+def environment():
+    '''Return a description of where the benchmarks ran, saved along with the results.'''
+    return {
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'machine': platform.machine(),
+        'video_driver': pygame.display.get_driver(),
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time the hot paths of the frame loop.')
+    parser.add_argument('--rounds', type=int, default=5, help='times every benchmark is run, keeping the fastest')
+    parser.add_argument('--frames', type=int, default=300, help='frames played per seed')
+    parser.add_argument('--output', metavar='PATH', help='write the results to a JSON file')
+    parser.add_argument('--baseline', metavar='PATH', nargs='?', const=BASELINE,
+                        help=f'compare with the results in a JSON file, {BASELINE} by default')
+    parser.add_argument('--save-baseline', metavar='PATH', nargs='?', const=BASELINE,
+                        help=f'write the results as the new baseline, {BASELINE} by default')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='fraction a benchmark may be slower than the baseline before failing')
+    args = parser.parse_args()
+
+    results = run_suite(args.rounds, args.frames)
+    report = {'environment': environment(), 'results': results}
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    regressions = compare(results, baseline, args.threshold)
+
+    for name, result in results.items():
+        line = f"{name:30} {result['mean_us']:9.2f} us"
+        if name in baseline:
+            line += f"  ({result['mean_us'] / baseline[name]['mean_us'] - 1:+.0%} vs baseline)"
+        if name in regressions:
+            line += '  SLOWER'
+        print(line)
+
+    if regressions:
+        print(f'{len(regressions)} benchmarks slower than the baseline by more than {args.threshold:.0%}')
+        sys.exit(1)
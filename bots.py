@@ -0,0 +1,97 @@
+from dino import NOOP, JUMP, DUCK, FLYING_LIZARD, variants
+
+class ReflexBot:
+    '''A bot that jumps over or ducks under the current obstacle when it comes close.'''
+    def __init__(self, reaction=1.0):
+        '''Initialize bot, reaction scales how early it acts.'''
+        self.reaction = reaction
+        # Bounding rects of the opaque pixels of each obstacle variant.
+        self.opaque_rects = {}
+
+    def act(self, game):
+        '''Return the action to take in the current frame of game.'''
+        trex = game.trex
+        entities = game.entities
+        rows = entities.groups[game.obstacle]
+        first, last = entities.rect(rows[0]), entities.rect(rows[-1])
+        if last.right < trex.feet_rect.left:
+            return NOOP
+
+        if entities.kinds[rows[0]] == FLYING_LIZARD:
+            speed = game.settings.flying_lizard_speed
+            # High flying lizards pass over trex, middle ones can be ducked under.
+            bottom = first.top + self._opaque_rect(entities.variants[rows[0]]).bottom
+            if bottom <= trex.head_rect.top:
+                return NOOP
+            if bottom <= trex.head_duck_rect.top:
+                return DUCK if first.left - trex.head_duck_rect.right < speed * 2 else NOOP
+        else:
+            speed = game.settings.cactus_speed
+
+        distance = first.left - trex.head_rect.right
+        if distance < speed * 2 * self.reaction + (last.right - first.left) // 4:
+            return JUMP
+        return NOOP
+
+    def margin(self, game):
+        '''Return a distance in front of trex, beyond which the bot does nothing about the current obstacle.
+
+        Given to DinoGame.fast_forward, the game plays as if the bot was asked every step.
+        '''
+        trex = game.trex
+        entities = game.entities
+        rows = entities.groups[game.obstacle]
+        first, last = entities.rect(rows[0]), entities.rect(rows[-1])
+        speed = max(game.settings.cactus_speed, game.settings.flying_lizard_speed)
+        # Ducking is decided from the front of the duck hit box.
+        ahead = max(0, trex.head_duck_rect.right - trex.head_rect.right)
+        return int(speed * 2 * self.reaction) + (last.right - first.left) // 4 + ahead + 1
+
+    def _opaque_rect(self, variant):
+        '''Return the bounding rect of the opaque pixels of a variant, relative to its rect.'''
+        rect = self.opaque_rects.get(variant)
+        if rect is None:
+            rect = variants.masks[variant].get_bounding_rects()[0]
+            self.opaque_rects[variant] = rect
+        return rect
+
+class LookaheadBot:
+    '''A bot that tries each action on copies of the game's state, and takes the first one that survives.
+
+    After the action tried, the game is played on with the same plan for horizon steps:
+    doing nothing after a jump, and ducking on after a duck.
+    '''
+    # Plans as the first action and the action of the following steps, in order of preference.
+    plans = ((NOOP, NOOP), (JUMP, NOOP), (DUCK, DUCK))
+
+    def __init__(self, horizon=20):
+        '''Initialize bot, looking horizon steps ahead.'''
+        self.horizon = horizon
+        self.rollouts = 0
+
+    def act(self, game):
+        '''Return the action to take in the current frame of game.'''
+        # Steps played while looking ahead must not end up in a recording, the leaderboard
+        # or the inputs sent to a race.
+        hooks = game.recorder, game.leaderboard, game.ghost
+        game.recorder = game.leaderboard = game.ghost = None
+        state = game.snapshot()
+        try:
+            for first, then in self.plans:
+                if self._survives(game, first, then):
+                    return first
+                game.restore(state)
+            return NOOP
+        finally:
+            game.restore(state)
+            game.recorder, game.leaderboard, game.ghost = hooks
+
+    def _survives(self, game, first, then):
+        '''Play a plan from the current state, and return whether trex is alive at its end.'''
+        self.rollouts += 1
+        if not game.step(first):
+            return False
+        for _ in range(self.horizon - 1):
+            if not game.step(then):
+                return False
+        return True
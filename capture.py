@@ -0,0 +1,134 @@
+import zlib
+import queue
+import shlex
+import struct
+import threading
+import subprocess
+from pathlib import Path
+
+import pygame
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+def png_chunk(kind, data):
+    '''Return a PNG chunk of kind holding data.'''
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(data, zlib.crc32(kind)))
+
+def encode_png(pixels, size, level=1):
+    '''Return a PNG image of size from pixels, rows of RGB bytes.'''
+    width, height = size
+    stride = width * 3
+    view = memoryview(pixels)
+    # Each row starts with its filter type, left 0 for none.
+    rows = bytearray(height * (stride + 1))
+    for y in range(height):
+        start = y * (stride + 1) + 1
+        rows[start:start + stride] = view[y * stride:(y + 1) * stride]
+    return b''.join((
+        PNG_SIGNATURE,
+        png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)),
+        # zlib releases the GIL while compressing, so the game keeps running meanwhile.
+        png_chunk(b'IDAT', zlib.compress(rows, level)),
+        png_chunk(b'IEND', b''),
+    ))
+
+class Capture:
+    '''A class to save the frames shown on the display without stalling the game loop.
+
+    Each frame is copied into a surface from a pool, and a worker thread writes it out,
+    either as a numbered PNG file in a directory or as raw RGB frames to the input of a
+    command such as a video encoder. When the worker falls behind and every surface of
+    the pool is waiting to be written, frames are dropped and counted instead.
+    '''
+    def __init__(self, screen, directory=None, command=None, pool_size=8, compression=1):
+        '''Initialize capture of frames like screen, into directory or to command.
+
+        In command, {width} and {height} are replaced by the size of the frames.
+        '''
+        if (directory is None) == (command is None):
+            raise ValueError('capture needs either a directory or a command')
+        self.size = screen.get_size()
+        self.compression = compression
+
+        # Frames given, frames written out, and frames dropped as no surface was free.
+        self.frames = 0
+        self.written = 0
+        self.dropped = 0
+        # Error that stopped writing, after which frames are only counted as dropped.
+        self.error = None
+
+        self.directory = None
+        self.process = None
+        if directory is not None:
+            self.directory = Path(directory)
+            self.directory.mkdir(parents=True, exist_ok=True)
+        else:
+            width, height = self.size
+            args = shlex.split(command.format(width=width, height=height))
+            self.process = subprocess.Popen(args, stdin=subprocess.PIPE)
+
+        # Surfaces have the format of the screen, so copying is a plain blit.
+        self.free = queue.SimpleQueue()
+        for _ in range(pool_size):
+            self.free.put(pygame.Surface(self.size, 0, screen))
+        self.pending = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self._work, name='capture', daemon=True)
+        self.thread.start()
+
+    def add(self, surface):
+        '''Copy surface as the next frame, and return whether it was kept rather than dropped.'''
+        index = self.frames
+        self.frames += 1
+        if self.error:
+            self.dropped += 1
+            return False
+        try:
+            frame = self.free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return False
+        frame.blit(surface, (0, 0))
+        self.pending.put((index, frame))
+        return True
+
+    def close(self):
+        '''Write the frames still pending, and stop the worker and the command.'''
+        self.pending.put(None)
+        self.thread.join()
+        if self.process:
+            try:
+                self.process.stdin.close()
+            except OSError:
+                pass
+            self.process.wait()
+
+    def summary(self):
+        '''Return a line telling how many frames were written and dropped.'''
+        line = f'captured {self.written} of {self.frames} frames, {self.dropped} dropped'
+        if self.error:
+            line += f', stopped by {self.error}'
+        return line
+
+    def _work(self):
+        '''Write out pending frames until closed, and put their surfaces back into the pool.'''
+        while True:
+            item = self.pending.get()
+            if item is None:
+                break
+            index, frame = item
+            if not self.error:
+                try:
+                    self._write(index, frame)
+                    self.written += 1
+                except OSError as error:
+                    self.error = error
+            self.free.put(frame)
+
+    def _write(self, index, frame):
+        '''Write frame number index out.'''
+        pixels = pygame.image.tobytes(frame, 'RGB')
+        if self.process:
+            self.process.stdin.write(pixels)
+        else:
+            path = self.directory / f'{index:06}.png'
+            path.write_bytes(encode_png(pixels, self.size, self.compression))
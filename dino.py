@@ -1,20 +1,91 @@
+import gc
+import io
 import sys
+import csv
+import inspect
+import json
+import mmap
+import time
+import zlib
+import weakref
 import random
+import struct
+import argparse
+import tracemalloc
+from array import array
+from collections import Counter, OrderedDict, namedtuple
 from itertools import accumulate
 from pathlib import Path
 
+# When the game started loading, to measure the time to the first frame.
+STARTED = time.perf_counter()
+
 import pygame
+from pygame._sdl2.video import Window
+
+# Directory of the game, which paths of images and fonts are relative to.
+ROOT = Path(__file__).resolve().parent
+
+# Actions accepted by DinoGame.step. They are bit flags, so JUMP | DUCK is also valid.
+NOOP = 0
+JUMP = 1
+DUCK = 2
+
+# Kinds of entities, see Entities.
+CACTUS, FLYING_LIZARD, CLOUD, STAR, MOON, STONE = range(6)
+
+# Speed classes of entities. Obstacles move at the speed of their setting, and the
+# background scrolls in layers: far and middle ones slowly, the ground as fast as cacti.
+CACTUS_SPEED, FLYING_LIZARD_SPEED, FAR, MID = range(4)
 
 class Settings:
     '''A class to store settings of dino game.'''
-    def __init__(self):
-        '''Initialize settings'''
+    def __init__(self, **overrides):
+        '''Initialize settings, replacing any of them given as keyword arguments.'''
+        self.configure(**overrides)
+
+    def configure(self, **overrides):
+        '''Set all settings to the original ones, replacing any given as keyword arguments.'''
+        self.overrides = overrides
         self.screen_width = 800
         self.screen_height = 450
         self.bg_color = (10, 10, 10)
 
+        # The screen is always drawn at screen_width x screen_height, and scaled to a window of
+        # window_size, or the whole display when fullscreen, if either is given. With scale_mode
+        # 'gpu', SDL scales it while presenting, to the window it is shown in. 'fit', 'integer'
+        # and 'stretch' scale it in software, keeping its aspect ratio, by a whole factor, or to
+        # fill the window; the first two leave black bars around it.
+        self.window_size = None
+        self.fullscreen = False
+        self.scale_mode = 'gpu'
+
+        # Redraw and update only the changed parts of the screen, instead of all of it.
+        self.dirty_rects = False
+
+        # The game is simulated in fixed steps per second, and all speeds are in pixels per step.
+        # Frames are drawn up to frame_rate per second (0 for no limit), in between steps.
+        self.sim_rate = 30
+        self.frame_rate = 60
+        # Steps simulated for one frame at most, before the game is allowed to slow down.
+        self.max_sim_steps = 5
+
         self.speedup_scale = 1.2
         self.milestones = (200, 500, 1000, 2000, 5000, 10000, 20000, 50000, float('inf'))
+
+        # Obstacles come one at a time, or with obstacle_stream, several on screen at once with
+        # gaps of obstacle_gap steps up to max_gap_scale times that, shortening as speed rises.
+        self.obstacle_stream = False
+        self.obstacle_gap = 18
+        self.max_gap_scale = 1.5
+        # Copies of each obstacle the stream can show at once, created with the game when
+        # obstacle_stream is on.
+        self.obstacle_pool = 4
+
+        # With day_night, colors are inverted from every other milestone on, and back again at the
+        # next one, cross-fading over fade_frames frames.
+        self.day_night = False
+        self.fade_frames = 12
         self.reset_state()
 
     def reset_state(self):
@@ -25,6 +96,18 @@ class Settings:
         self.flying_lizard_speed = 20
         self.milestone_point = 0
 
+        # Settings given when creating the game replace the original ones.
+        for name, value in self.overrides.items():
+            setattr(self, name, value)
+
+    def speed(self, speed_class):
+        '''Return the speed in pixels per step of entities of a speed class.'''
+        if speed_class == CACTUS_SPEED:
+            return self.cactus_speed
+        if speed_class == FLYING_LIZARD_SPEED:
+            return self.flying_lizard_speed
+        return 1 if speed_class == FAR else 2
+
     def increase_speed(self):
         '''Increase game speed and points gained when reaching a milestone point.'''
         self.cactus_speed = int(self.cactus_speed * self.speedup_scale)
@@ -33,50 +116,1130 @@ class Settings:
         self.milestone_point += 1
 
     def get_font(self, fpath=None, size=12):
-        '''Get pygame Font object with Press Start 2P as the default font.'''
-        if not fpath:
-            fpath = Path('font/Press_Start_2P/PressStart2P-Regular.ttf')
-        return pygame.font.Font(fpath, size)
+        '''Get the shared pygame Font object of a size, with Press Start 2P as the default font.
+
+        Each font file is read once, however many sizes of it are used.
+        '''
+        key = (fpath, size)
+        font = fonts.get(key)
+        if font is None:
+            path = ROOT / (fpath or 'font/Press_Start_2P/PressStart2P-Regular.ttf')
+            if path not in font_files:
+                font_files[path] = path.read_bytes()
+            font = pygame.font.Font(io.BytesIO(font_files[path]), size)
+            fonts[key] = font
+        return font
+
+    def get_atlas(self, fpath=None, size=12, color=(100, 100, 100)):
+        '''Get the shared GlyphAtlas of a font, size and color.
+
+        With day_night, it has the atlas of the inverted color too, see GlyphAtlas.text.
+        '''
+        atlas = self._get_atlas(fpath, size, color)
+        if self.day_night and atlas.inverted is None:
+            atlas.inverted = self._get_atlas(fpath, size, invert_color(color))
+        return atlas
+
+    def _get_atlas(self, fpath, size, color):
+        '''Get the shared GlyphAtlas of a font, size and color, creating it the first time.'''
+        key = (fpath, size, color)
+        if key not in atlases:
+            atlases[key] = GlyphAtlas(self.get_font(fpath, size), color)
+        return atlases[key]
+
+class GlyphAtlas:
+    '''A class to draw text from glyphs rasterized once into a single image.'''
+    # Color of the transparent background of the atlas and of images drawn from it.
+    colorkey = (255, 0, 255)
+
+    def __init__(self, font, color, chars='0123456789HI ', max_texts=32):
+        '''Initialize glyph atlas of chars, which are rendered the first time they are needed.
+
+        At most max_texts recently used whole texts are kept, see text.
+        '''
+        self.font = font
+        self.color = color
+        self.chars = chars
+        self.image = None
+        # Atlas of the inverted color, whose texts are the inverted images of these.
+        self.inverted = None
+
+        # Whole texts, such as messages, are rendered once too.
+        self.max_texts = max_texts
+        self.texts = OrderedDict()
+
+    def _rasterize(self):
+        '''Render chars side by side into the atlas image.'''
+        font, chars = self.font, self.chars
+
+        # Glyphs are drawn on an opaque colorkey background, so copying a glyph
+        # replaces whatever was drawn at its place before.
+        self.image = self._new_image(font.size(chars))
+        self.image.set_colorkey(None)
+        self.image.blit(font.render(chars, False, self.color), (0, 0))
+        self.height = self.image.get_height()
+
+        # Area of each glyph in the atlas image.
+        self.glyphs = {}
+        for i, char in enumerate(chars):
+            self.glyphs[char] = pygame.Rect(font.size(chars[:i])[0], 0, font.size(char)[0], self.height)
+
+    def _new_image(self, size):
+        '''Return a new image filled with the transparent colorkey.'''
+        image = pygame.Surface(size)
+        if pygame.display.get_surface():
+            image = image.convert()
+        image.fill(self.colorkey)
+        image.set_colorkey(self.colorkey)
+        return image
+
+    def size(self, text):
+        '''Return width and height of text drawn from glyphs.'''
+        if self.image is None:
+            self._rasterize()
+        return sum(self.glyphs[char].width for char in text), self.height
+
+    def blank(self, text):
+        '''Return a new transparent image that fits text.'''
+        return self._new_image(self.size(text))
+
+    def draw(self, surface, text, pos=(0, 0), previous=None):
+        '''Draw text onto surface by copying glyphs from the atlas.
+
+        If previous is the text already drawn there, only the glyphs that differ are copied.
+        '''
+        if self.image is None:
+            self._rasterize()
+        x, y = pos
+        for i, char in enumerate(text):
+            area = self.glyphs[char]
+            if not previous or previous[i] != char:
+                surface.blit(self.image, (x, y), area)
+            x += area.width
+
+    def text(self, text):
+        '''Return an image of text, rendering it only the first time it is used recently.
+
+        With an inverted atlas, the text is rendered in the inverted color as well, and used
+        as the inverted image, so no text is ever inverted while drawing.
+        '''
+        image = self.texts.get(text)
+        if image is not None:
+            self.texts.move_to_end(text)
+        else:
+            image = self.font.render(text, True, self.color)
+            self.texts[text] = image
+            # Texts such as leader lines keep changing, and the ones not used for the longest time are forgotten.
+            while len(self.texts) > self.max_texts:
+                self.texts.popitem(last=False)
+        if self.inverted and image not in inverted_images:
+            inverted_images.add(image, self.inverted.text(text))
+        return image
+
+# Fonts, the contents of their files and glyph atlases are shared by all games in the process.
+fonts = {}
+font_files = {}
+atlases = {}
+
+# Bundle file header: magic, version and length of the index, followed by the index
+# as JSON and the raw RGBA pixels of every image in it.
+BUNDLE_MAGIC = b'DINOPACK'
+BUNDLE_VERSION = 1
+BUNDLE_HEADER = struct.Struct('<8sBI')
+
+class AssetCache:
+    '''A class to load each image once and share its scaled, flipped and faded variants.'''
+    def __init__(self, max_variants=64, bundle=ROOT / 'assets.bundle'):
+        '''Initialize asset cache, keeping at most max_variants recently used variants.
+
+        Variants packed into the bundle file, if it exists, are used without decoding
+        and scaling their images, see save_bundle.
+        '''
+        self.max_variants = max_variants
+        self.images = {}
+        self.variants = OrderedDict()
+        self.masks = {}
+
+        self.bundle = bundle
+        # Images mapped from the bundle by path, scale and flip, once it is loaded.
+        self.bundled = None
+        self.mapped = None
+
+    def get(self, path, scale=1, flip=False, alpha=None):
+        '''Get the image at path, scaled, flipped horizontally and with alpha set as given.
+
+        The returned surface is shared, so it must not be modified.
+        '''
+        key = (path, scale, flip, alpha)
+        image = self.variants.get(key)
+        if image is not None:
+            self.variants.move_to_end(key)
+            return image
+
+        if self.bundled is None:
+            self.load_bundle()
+        image = self.bundled.get((path, scale, flip))
+        shared = image is not None
+        if image is None:
+            image = self._load(path)
+            if scale != 1:
+                image = pygame.transform.scale_by(image, scale)
+            if flip:
+                image = pygame.transform.flip(image, flip_x=True, flip_y=False)
+            shared = image is self.images[path]
+        if alpha is not None:
+            if shared:
+                image = image.copy()
+            image.set_alpha(alpha)
+
+        self.variants[key] = image
+        # Forget the variants that have not been used for the longest time.
+        while len(self.variants) > self.max_variants:
+            self.variants.popitem(last=False)
+        return image
+
+    def get_mask(self, path, scale=1, flip=False):
+        '''Get the collision mask of the opaque pixels of an image variant.'''
+        key = (path, scale, flip)
+        mask = self.masks.get(key)
+        if mask is None:
+            mask = pygame.mask.from_surface(self.get(path, scale, flip))
+            self.masks[key] = mask
+        return mask
+
+    def _load(self, path):
+        '''Load image from disk once, in the pixel format of the display when there is one.'''
+        image = self.images.get(path)
+        if image is None:
+            image = pygame.image.load(ROOT / path)
+            if pygame.display.get_surface():
+                image = image.convert_alpha()
+            self.images[path] = image
+        return image
+
+    def save_bundle(self, path):
+        '''Pack the pixels of every variant loaded so far, without alpha, into a bundle file.
+
+        Return the number of images packed.
+        '''
+        entries = []
+        pixels = []
+        offset = 0
+        for key in dict.fromkeys(variant[:3] for variant in self.variants):
+            image = self.get(*key)
+            data = pygame.image.tobytes(image, 'RGBA')
+            entries.append([*key, *image.get_size(), offset])
+            pixels.append(data)
+            offset += len(data)
+
+        # Images that changed since the bundle was saved are loaded from their files instead.
+        sources = {image_path: self._checksum(image_path) for image_path, *_ in entries}
+        index = json.dumps({'sources': sources, 'images': entries}).encode()
+        with open(path, 'wb') as f:
+            f.write(BUNDLE_HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, len(index)))
+            f.write(index)
+            f.writelines(pixels)
+        return len(entries)
+
+    def load_bundle(self):
+        '''Map the bundle file into memory and make an image of each variant in it.
+
+        Images of the bundle use its memory directly, unless they are converted to the
+        pixel format of the display.
+        '''
+        self.bundled = {}
+        if not self.bundle or not Path(self.bundle).exists():
+            return
+        with open(self.bundle, 'rb') as f:
+            # Copy on write mapping, as pygame needs writable buffers.
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        magic, version, index_size = BUNDLE_HEADER.unpack_from(data)
+        if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION:
+            return
+        start = BUNDLE_HEADER.size + index_size
+        index = json.loads(data[BUNDLE_HEADER.size:start])
+
+        stale = {path for path, checksum in index['sources'].items() if self._checksum(path) != checksum}
+        view = memoryview(data)
+        for path, scale, flip, width, height, offset in index['images']:
+            if path in stale:
+                continue
+            offset += start
+            image = pygame.image.frombuffer(view[offset:offset + width * height * 4], (width, height), 'RGBA')
+            if pygame.display.get_surface():
+                image = image.convert_alpha()
+            self.bundled[(path, scale, flip)] = image
+        self.mapped = data
+
+    @staticmethod
+    def _checksum(path):
+        '''Return a checksum of an image file, or None if it does not exist.'''
+        try:
+            return zlib.crc32((ROOT / path).read_bytes())
+        except FileNotFoundError:
+            return None
+
+    def clear(self):
+        '''Forget all loaded images and their variants.'''
+        self.images.clear()
+        self.variants.clear()
+        self.masks.clear()
+        self.bundled = None
+
+# Images are shared by all games in the process.
+assets = AssetCache()
+
+# Images of background layers, shared by the games that use them.
+layer_images = weakref.WeakValueDictionary()
+
+class Variants:
+    '''A class to number the looks of entities, shared by all games in the process.
+
+    A variant is an image variant of the asset cache, or a rect filled with a color.
+    '''
+    def __init__(self):
+        '''Initialize variants.'''
+        self.ids = {}
+        # Image or fill color, size and collision mask of each variant, by id.
+        self.images = []
+        self.sizes = []
+        self.masks = []
+
+    def image(self, path, scale=1, flip=False, alpha=None):
+        '''Return the id of an image variant, see AssetCache.get.'''
+        key = (path, scale, flip, alpha)
+        variant = self.ids.get(key)
+        if variant is None:
+            image = assets.get(path, scale, flip, alpha)
+            variant = self._add(key, image, image.get_size(), assets.get_mask(path, scale, flip))
+        return variant
+
+    def rect(self, color, size):
+        '''Return the id of a rect of size filled with color.'''
+        key = (color, size)
+        variant = self.ids.get(key)
+        if variant is None:
+            variant = self._add(key, color, size, pygame.mask.Mask(size, fill=True))
+        return variant
+
+    def _add(self, key, image, size, mask):
+        '''Add a new variant and return its id.'''
+        variant = len(self.images)
+        self.ids[key] = variant
+        self.images.append(image)
+        self.sizes.append(size)
+        self.masks.append(mask)
+        return variant
+
+variants = Variants()
+
+def invert_color(color):
+    '''Return the inverse of an RGB color.'''
+    return tuple(255 - c for c in color[:3])
+
+class InvertedImages:
+    '''A class to keep a copy of images with their colors inverted, made once per image.'''
+    def __init__(self):
+        '''Initialize inverted images.'''
+        self.images = weakref.WeakKeyDictionary()
+
+    def get(self, image):
+        '''Return image with its colors inverted, inverting it only the first time.'''
+        inverted = self.images.get(image)
+        if inverted is None:
+            inverted = self.images[image] = self._invert(image)
+        return inverted
+
+    def add(self, image, inverted):
+        '''Use inverted as the inverted image, for images whose pixels change, such as scores,
+        or drawn in the inverted color instead, such as texts.'''
+        self.images[image] = inverted
+
+    def __contains__(self, image):
+        '''Return whether the inverted image of image is made.'''
+        return image in self.images
+
+    def drawables(self, drawables):
+        '''Return drawables, pairs of image (or color) and rect, with inverted images and colors.'''
+        return [
+            (invert_color(image) if isinstance(image, tuple) else self.get(image), rect)
+            for image, rect in drawables
+        ]
+
+    @staticmethod
+    def _invert(image):
+        '''Return a copy of image with inverted colors and the same transparency.'''
+        size = image.get_size()
+        per_pixel = image.get_flags() & pygame.SRCALPHA
+        inverted = pygame.Surface(size, pygame.SRCALPHA if per_pixel else 0, image)
+        inverted.fill((255, 255, 255, 255))
+        # Blend modes ignore transparency, so this subtracts each color from white.
+        inverted.blit(image, (0, 0), special_flags=pygame.BLEND_RGB_SUB)
+        if per_pixel:
+            # Multiplying by the image with all its colors white copies its alpha.
+            alpha = image.copy()
+            alpha.fill((255, 255, 255, 0), special_flags=pygame.BLEND_RGBA_MAX)
+            inverted.blit(alpha, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
+        # Images blitted run-length encoded stay so, as they are mostly transparent.
+        rle = pygame.RLEACCEL if image.get_flags() & (pygame.RLEACCEL | pygame.RLEACCELOK) else 0
+        if image.get_colorkey():
+            inverted.set_colorkey(invert_color(image.get_colorkey()), rle)
+        if image.get_alpha() is not None:
+            inverted.set_alpha(image.get_alpha(), rle)
+        return inverted
+
+# Inverted images are shared by all games in the process, like the images themselves.
+inverted_images = InvertedImages()
+
+class Entities:
+    '''A class to hold entities, such as obstacles, as parallel columns of numbers.
+
+    Each entity is a row of kind, position of its top left corner, variant and speed
+    class. Entities added together form a group, like the cacti of one obstacle,
+    which moves as one.
+    '''
+    def __init__(self):
+        '''Initialize empty columns.'''
+        self.kinds = array('B')
+        self.xs = array('i')
+        self.ys = array('i')
+        self.variants = array('H')
+        self.speeds = array('B')
+        # Rows of each group, by id.
+        self.groups = []
+
+    def add_group(self, rows):
+        '''Add entities given as tuples of kind, x, y, variant and speed class, and return their group's id.'''
+        start = len(self.kinds)
+        for kind, x, y, variant, speed in rows:
+            self.kinds.append(kind)
+            self.xs.append(x)
+            self.ys.append(y)
+            self.variants.append(variant)
+            self.speeds.append(speed)
+        self.groups.append(range(start, len(self.kinds)))
+        return len(self.groups) - 1
+
+    def move(self, group, distance):
+        '''Move the entities of a group to the left by distance.'''
+        xs = self.xs
+        for i in self.groups[group]:
+            xs[i] -= distance
+
+    def rect(self, i):
+        '''Return the rect of an entity.'''
+        return pygame.Rect(self.xs[i], self.ys[i], *variants.sizes[self.variants[i]])
+
+    def drawables(self, group=None):
+        '''Return the entities of a group, or all of them, as pairs of image (or color) and rect tuple.'''
+        rows = self.groups[group] if group is not None else range(len(self.kinds))
+        images, sizes = variants.images, variants.sizes
+        drawables = []
+        for i in rows:
+            variant = self.variants[i]
+            drawables.append((images[variant], (self.xs[i], self.ys[i], *sizes[variant])))
+        return drawables
+
+class FrameProfiler:
+    '''A class to record how long each phase of the most recent frames took.'''
+    # Phases of a frame in run_game. Collide is part of update and flip part of draw,
+    # and their time is not counted again in the phase around them.
+    phases = ('events', 'update', 'collide', 'draw', 'flip', 'tick')
+
+    def __init__(self, game, capacity=3600, overlay=False):
+        '''Initialize profiler, keeping the times of the last capacity frames.'''
+        self.screen = game.screen
+        self.screen_rect = self.screen.get_rect()
+        self.capacity = capacity
+        self.overlay = overlay
+
+        # Ring buffers of seconds spent per phase and per whole frame.
+        self.times = {phase: array('d', bytes(8 * capacity)) for phase in self.phases}
+        self.frame_times = array('d', bytes(8 * capacity))
+        self.frames = 0
+        self.index = 0
+
+        self.frame_start = 0
+        self.last = 0
+        # Time of nested phases since the last mark.
+        self.nested = 0
+
+        self.font = game.settings.get_font(size=10)
+        self.text_color = (100, 100, 100)
+        # With day_night, the overlay is rendered in the inverted color too.
+        self.inverted_color = invert_color(self.text_color) if game.settings.day_night else None
+        self.prepare_overlay()
+
+    def begin(self, now=None):
+        '''Start timing a frame.'''
+        if now is None:
+            now = time.perf_counter()
+        self.frame_start = self.last = now
+        self.nested = 0
+        for times in self.times.values():
+            times[self.index] = 0
+
+    def mark(self, phase):
+        '''End phase of the current frame, which started when the last phase ended.'''
+        now = time.perf_counter()
+        self.times[phase][self.index] = now - self.last - self.nested
+        self.last = now
+        self.nested = 0
+
+    def add(self, phase, seconds):
+        '''Add seconds spent in a phase nested in the current one.'''
+        self.times[phase][self.index] += seconds
+        self.nested += seconds
+
+    def call(self, phase, function):
+        '''Call function, timing it as a nested phase.'''
+        start = time.perf_counter()
+        function()
+        self.add(phase, time.perf_counter() - start)
+
+    def end(self):
+        '''End the current frame, with the time since the last phase spent in clock.tick.'''
+        self.mark('tick')
+        self.frame_times[self.index] = self.last - self.frame_start
+        self.frames += 1
+        self.index = self.frames % self.capacity
+        # The overlay changes twice per second at 60 frames per second.
+        if self.overlay and self.frames % 30 == 0:
+            self.prepare_overlay()
+
+    def _recent(self, times):
+        '''Return the values of a ring buffer for finished frames, from oldest to newest.'''
+        if self.frames < self.capacity:
+            return times[:self.frames]
+        # The value at index belongs to the frame being recorded.
+        return times[self.index + 1:] + times[:self.index]
+
+    def stats(self):
+        '''Return p50 and p99 frame time and the busiest phase with its mean, all in milliseconds.
+
+        Tick is left out of the busiest phase, as it is mostly waiting for the next frame.
+        '''
+        frame_times = sorted(self._recent(self.frame_times))
+        if not frame_times:
+            return 0, 0, None, 0
+
+        def percentile(q):
+            return frame_times[min(len(frame_times) - 1, max(0, round(q / 100 * len(frame_times)) - 1))] * 1e3
+
+        means = {
+            phase: sum(self._recent(times)) / len(frame_times) * 1e3
+            for phase, times in self.times.items() if phase != 'tick'
+        }
+        busiest = max(means, key=means.get)
+        return percentile(50), percentile(99), busiest, means[busiest]
+
+    def prepare_overlay(self):
+        '''Prepare the text of the overlay with the current stats to draw.'''
+        p50, p99, busiest, busiest_ms = self.stats()
+        last = self.frame_times[self.index - 1] * 1e3 if self.frames else 0
+        text = f'frame {last:.1f} ms  p50 {p50:.1f}  p99 {p99:.1f}'
+        if busiest:
+            text += f'  {busiest} {busiest_ms:.1f} ms'
+        self.overlay_img = self._render(text)
+        self.overlay_img_rect = self.overlay_img.get_rect()
+        self.overlay_img_rect.left = self.screen_rect.left + 10
+        self.overlay_img_rect.bottom = self.screen_rect.bottom - 10
+
+    def _render(self, text):
+        '''Return an image of text, with its inverted image rendered in the inverted color if needed.'''
+        image = self.font.render(text, True, self.text_color)
+        if self.inverted_color:
+            inverted_images.add(image, self.font.render(text, True, self.inverted_color))
+        return image
+
+    def draw(self):
+        '''Draw overlay.'''
+        self.screen.blit(self.overlay_img, self.overlay_img_rect)
+
+    def write_csv(self, path):
+        '''Write the milliseconds of each recent frame and its phases to a CSV file.'''
+        columns = [self._recent(self.times[phase]) for phase in self.phases]
+        columns.append(self._recent(self.frame_times))
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(self.phases + ('frame',))
+            for row in zip(*columns):
+                writer.writerow([f'{seconds * 1e3:.3f}' for seconds in row])
+
+    def histogram(self, bin_ms=2, max_ms=50, width=50):
+        '''Return a text histogram of recent frame times.'''
+        counts = [0] * (max_ms // bin_ms + 1)
+        for seconds in self._recent(self.frame_times):
+            counts[min(int(seconds * 1e3 // bin_ms), len(counts) - 1)] += 1
+        peak = max(counts) or 1
+        lines = []
+        for i, count in enumerate(counts):
+            label = f'{i * bin_ms:>3}-{(i + 1) * bin_ms:<3}' if i < len(counts) - 1 else f'{max_ms:>3}+   '
+            lines.append(f'{label} ms {count:6} {"#" * round(count / peak * width)}')
+        return '\n'.join(lines)
+
+class AllocationProfiler(FrameProfiler):
+    '''A class to record the memory allocated and the garbage collections of each phase of recent frames.
+
+    It times frames like FrameProfiler, and can take its place as the profiler of a game.
+    Allocations are counted when they outlive the phase or frame they were made in, as
+    those are the ones that add up to trigger the garbage collector; objects freed right
+    away never do. Blocks and bytes per phase are read from the interpreter's counters,
+    and a tracemalloc snapshot after each frame tells which source lines made the
+    allocations of that frame. Frames making more than budget allocations are counted,
+    and reported by alert at most once per second.
+    '''
+    def __init__(self, game, capacity=3600, overlay=False, budget=None, top=10):
+        '''Initialize profiler, keeping the counts of the last capacity frames, and reporting top lines.'''
+        super().__init__(game, capacity, overlay)
+        self.budget = budget
+        self.top = top
+
+        # Ring buffers of allocated blocks and bytes per phase, and of garbage collection time
+        # per phase, all net of nested phases, and of allocations made in each whole frame.
+        self.blocks = {phase: array('q', bytes(8 * capacity)) for phase in self.phases}
+        self.sizes = {phase: array('q', bytes(8 * capacity)) for phase in self.phases}
+        self.gc_times = {phase: array('d', bytes(8 * capacity)) for phase in self.phases}
+        self.frame_allocations = array('q', bytes(8 * capacity))
+        self.frame_sizes = array('q', bytes(8 * capacity))
+
+        # Allocations and bytes made by each source line, over all frames profiled.
+        self.line_allocations = Counter()
+        self.line_sizes = Counter()
+
+        # Pause and generation of each garbage collection, and the time of the one going on.
+        self.gc_pauses = []
+        self.gc_start = 0
+        self.gc_pending = 0
+
+        self.over_budget = 0
+        self.last_alert = 0
+
+        self.last_blocks = self.last_size = 0
+        self.nested_blocks = self.nested_size = 0
+
+        # Allocations of tracemalloc itself and of the profiler's own lines are left out.
+        self.filters = (tracemalloc.Filter(False, tracemalloc.__file__),)
+        self.own_lines = []
+        for cls in (FrameProfiler, AllocationProfiler):
+            source, start = inspect.getsourcelines(cls)
+            self.own_lines.append(range(start, start + len(source)))
+        # Tracing started by whoever runs the game is theirs, and left on when closed.
+        self.started_tracing = not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start()
+        self.snapshot = tracemalloc.take_snapshot().filter_traces(self.filters)
+        gc.callbacks.append(self._collected)
+
+    def close(self):
+        '''Stop tracing allocations and garbage collections.'''
+        if self._collected in gc.callbacks:
+            gc.callbacks.remove(self._collected)
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def begin(self, now=None):
+        '''Start timing a frame and counting its allocations.'''
+        super().begin(now)
+        # Collections between frames are the profiler's own.
+        self.gc_pending = 0
+        for counts in (self.blocks, self.sizes, self.gc_times):
+            for values in counts.values():
+                values[self.index] = 0
+        self.last_blocks = sys.getallocatedblocks()
+        self.last_size = tracemalloc.get_traced_memory()[0]
+        self.nested_blocks = self.nested_size = 0
+
+    def mark(self, phase):
+        '''End phase of the current frame, with the allocations since the last phase ended.'''
+        blocks = sys.getallocatedblocks()
+        size = tracemalloc.get_traced_memory()[0]
+        self.blocks[phase][self.index] = blocks - self.last_blocks - self.nested_blocks
+        self.sizes[phase][self.index] = size - self.last_size - self.nested_size
+        self.gc_times[phase][self.index] += self.gc_pending
+        self.gc_pending = 0
+        self.last_blocks, self.last_size = blocks, size
+        self.nested_blocks = self.nested_size = 0
+        super().mark(phase)
+
+    def call(self, phase, function):
+        '''Call function, timing it and counting its allocations as a nested phase.'''
+        blocks = sys.getallocatedblocks()
+        size = tracemalloc.get_traced_memory()[0]
+        gc_pending = self.gc_pending
+        super().call(phase, function)
+        blocks = sys.getallocatedblocks() - blocks
+        size = tracemalloc.get_traced_memory()[0] - size
+        self.blocks[phase][self.index] += blocks
+        self.sizes[phase][self.index] += size
+        self.gc_times[phase][self.index] += self.gc_pending - gc_pending
+        self.nested_blocks += blocks
+        self.nested_size += size
+        self.gc_pending = gc_pending
+
+    def end(self):
+        '''End the current frame, and count the allocations of each source line in it.'''
+        index = self.index
+        super().end()
+        snapshot = tracemalloc.take_snapshot().filter_traces(self.filters)
+        allocations = size = 0
+        lines = []
+        for diff in snapshot.compare_to(self.snapshot, 'lineno'):
+            line = diff.traceback[0]
+            if diff.count_diff > 0 and not self._own(line):
+                self.line_allocations[line] += diff.count_diff
+                self.line_sizes[line] += max(diff.size_diff, 0)
+                allocations += diff.count_diff
+                size += max(diff.size_diff, 0)
+                lines.append((diff.count_diff, line))
+        self.snapshot = snapshot
+        self.frame_allocations[index] = allocations
+        self.frame_sizes[index] = size
+
+        if self.budget is not None and allocations > self.budget:
+            self.over_budget += 1
+            now = time.perf_counter()
+            if now - self.last_alert >= 1:
+                self.last_alert = now
+                self.alert(self.frames, allocations, sorted(lines, reverse=True)[:3])
+
+    def _own(self, line):
+        '''Return whether a source line is part of the profiler.'''
+        return line.filename == __file__ and any(line.lineno in lines for lines in self.own_lines)
+
+    def alert(self, frame, allocations, lines):
+        '''Report that frame made more allocations than the budget, with its top lines as pairs of count and line.'''
+        top = ', '.join(f'{line} ({count})' for count, line in lines)
+        print(f'frame {frame}: {allocations} allocations, over the budget of {self.budget}: {top}', file=sys.stderr)
+
+    def _collected(self, phase, info):
+        '''Time a garbage collection, called by gc when it starts and stops.'''
+        if phase == 'start':
+            self.gc_start = time.perf_counter()
+            return
+        pause = time.perf_counter() - self.gc_start
+        self.gc_pending += pause
+        self.gc_pauses.append((pause, info['generation']))
+
+    def prepare_overlay(self):
+        '''Prepare the text of the overlay with the current stats and allocations to draw.'''
+        super().prepare_overlay()
+        if not self.frames:
+            return
+        recent = self._recent(self.frame_allocations)
+        text = f'alloc {sum(recent) / len(recent):.1f}/frame  gc {len(self.gc_pauses)}'
+        overlay_img = self._render(text)
+        rect = overlay_img.get_rect(left=self.overlay_img_rect.left, bottom=self.overlay_img_rect.top - 4)
+        size = self.overlay_img_rect.union(rect).size
+        image = self._stack(size, overlay_img, self.overlay_img, rect.height + 4)
+        if self.inverted_color:
+            inverted_images.add(image, self._stack(
+                size, inverted_images.get(overlay_img), inverted_images.get(self.overlay_img), rect.height + 4))
+        self.overlay_img = image
+        self.overlay_img_rect = image.get_rect(left=rect.left, top=rect.top)
+
+    @staticmethod
+    def _stack(size, top, bottom, y):
+        '''Return a transparent image of size with top drawn at its top and bottom at y.'''
+        image = pygame.Surface(size, pygame.SRCALPHA)
+        image.blit(top, (0, 0))
+        image.blit(bottom, (0, y))
+        return image
+
+    def report(self):
+        '''Return a text report of allocations per frame by phase and source line, and of garbage collections.'''
+        frames = min(self.frames, self.capacity)
+        if not frames:
+            return 'no frames profiled'
+        lines = ['phase      blocks/frame  bytes/frame  gc ms/frame']
+        for phase in self.phases:
+            blocks = sum(self._recent(self.blocks[phase])) / frames
+            size = sum(self._recent(self.sizes[phase])) / frames
+            gc_ms = sum(self._recent(self.gc_times[phase])) / frames * 1e3
+            lines.append(f'{phase:10} {blocks:12.2f} {size:12.1f} {gc_ms:12.4f}')
+
+        allocations = self._recent(self.frame_allocations)
+        sizes = self._recent(self.frame_sizes)
+        lines.append(f'{sum(allocations) / frames:.2f} allocations and {sum(sizes) / frames:.1f} bytes '
+                     f'outlive each frame on average, {max(allocations)} at most')
+        if self.budget is not None:
+            lines.append(f'{self.over_budget} of {self.frames} frames over the budget of {self.budget}')
+
+        lines.append(f'top lines, allocations and bytes per frame over {self.frames} frames:')
+        for line, count in self.line_allocations.most_common(self.top):
+            lines.append(f'  {count / self.frames:8.3f} {self.line_sizes[line] / self.frames:10.1f}  {line}')
+
+        if self.gc_pauses:
+            pauses = sorted(pause for pause, _ in self.gc_pauses)
+            generations = Counter(generation for _, generation in self.gc_pauses)
+            counts = ', '.join(f'gen {generation}: {generations[generation]}' for generation in sorted(generations))
+            lines.append(f'{len(pauses)} garbage collections ({counts}), {sum(pauses) * 1e3:.2f} ms in total, '
+                         f'p50 {pauses[len(pauses) // 2] * 1e3:.3f} ms, max {pauses[-1] * 1e3:.3f} ms')
+        else:
+            lines.append('no garbage collections')
+        return '\n'.join(lines)
+
+# Everything that changes while a game is played, as plain values, see DinoGame.snapshot.
+GameState = namedtuple('GameState', (
+    'seed', 'rng_draws', 'rng_state', 'game_active',
+    'obstacles', 'obstacle', 'obstacle_xs', 'active', 'next_obstacle',
+    'trex_ducking_rect', 'trex_duck_image', 'trex_default_y', 'trex_duck_y',
+    'trex_head_y', 'trex_feet_y', 'trex_head_duck_y',
+    'trex_jump', 'trex_reached', 'trex_duck', 'trex_mod',
+    'points', 'cactus_speed', 'flying_lizard_speed', 'milestone_point',
+    'score', 'high_score', 'layer_offsets',
+))
 
 class DinoGame:
     '''Main class to represent dino game.'''
-    def __init__(self):
-        '''Initialize trex game.'''
-        pygame.init()
+    def __init__(self, headless=False, settings=None, seed=None):
+        '''Initialize trex game.
+
+        In headless mode no window is created and the game is driven with step(),
+        drawing onto an off-screen surface only when a frame is requested.
+        '''
+        self.headless = headless
+        # All randomness of a game comes from its own generator, see _check_play_button.
+        self.seed = seed
+        self.rng = random.Random(seed)
+        # Choices made by the generator since the game started. Together with the seed
+        # they identify its state, which is only copied by snapshot when they change.
+        self.rng_draws = 0
+        self.rng_state = None
+        if headless:
+            pygame.font.init()
+        else:
+            pygame.init()
         self.clock = pygame.time.Clock()
-        self.settings = Settings()
-
-        self.screen = pygame.display.set_mode((self.settings.screen_width, self.settings.screen_height))
+        self.settings = settings if settings else Settings()
+
+        # Window the screen is scaled into when it is of another size, the area of it the
+        # screen fills, and the scale when it is a whole number, see _open_window.
+        self.window = None
+        self.target = None
+        self.scale = None
+        if headless:
+            self.screen = pygame.Surface((self.settings.screen_width, self.settings.screen_height))
+        else:
+            self._open_window()
+            pygame.display.set_caption('Dino Game')
         self.screen_rect = self.screen.get_rect()
-        pygame.display.set_caption('Dino Game')
 
         self.play_button = Button(self)
 
         self.trex = Trex(self)
-        self.obstacles = self._create_obstacles()
+        # All obstacles are entities, created once and moved back into place for a new game.
+        # One at a time, only the first copy of each is ever used, so no more are created.
+        self.obstacle_copies = self.settings.obstacle_pool if self.settings.obstacle_stream else 1
+        self.entities = self._create_obstacles()
+        self.start_xs = self.entities.xs[:]
+        self.patterns = len(self.entities.groups) // self.obstacle_copies
+        # Ids of obstacle groups in the order they may come, and the current one, which
+        # in a stream is the nearest one trex has not passed yet.
+        self.obstacles = self._order_obstacles()
         self.obstacle = self.obstacles[0]
 
+        # Groups of the obstacle stream on screen from left to right, the free copies of
+        # each obstacle, and the next obstacle to come with the gap before it.
+        self.active = []
+        self.pool = [[] for _ in range(self.patterns)]
+        self.stream = self._obstacle_stream()
+        self.next_obstacle = None
+
         self.scoreboard = Scoreboard(self)
 
         self.background = Background(self)
 
         self.game_active = False
 
+        # Images and rects drawn in the last frame, used by dirty rect rendering.
+        self.drawn = None
+
+        # Positions of moving objects before the last simulation step.
+        self.positions = None
+
+        # Frames into the fade to inverted colors, up to settings.fade_frames, and the
+        # surface the inverted frame is drawn on while fading, see _update_fade.
+        self.fade_frame = 0
+        self.fade_screen = None
+        if self.settings.day_night:
+            self._invert_images()
+
+        # Player's input for the next simulation step, as an action.
+        self.action = NOOP
+
+        # Object recording every game, see replay.Recorder.
+        self.recorder = None
+
+        # FrameProfiler timing the phases of each frame, when enabled.
+        self.profiler = None
+
+        # Object saving every frame shown, see capture.Capture.
+        self.capture = None
+
+        # Other player's trex in a race, see netplay.Ghost.
+        self.ghost = None
+
+        # Leaderboard keeping the score of every game, see leaderboard.Leaderboard.
+        self.leaderboard = None
+
         # The below attribute is only used for testing.
         #self.pcollide = (0, 0)
 
     def run_game(self):
-        '''Start running the game.'''
+        '''Start running the game.
+
+        The game is simulated at a fixed rate however fast frames are drawn, and each
+        frame shows objects between their positions of the last two simulation steps.
+        '''
+        step_time = 1 / self.settings.sim_rate
+        lag = 0
+        last_time = time.perf_counter()
+        profiler = self.profiler
         while True:
+            now = time.perf_counter()
+            lag += now - last_time
+            last_time = now
+
+            if profiler:
+                profiler.begin(now)
             self._check_events()
-            if self.game_active:
-                self._update_background()
-                self._update_obstacle()
-                self._update_trex_jump()
-                self.trex.duck_action()
-                self._check_trex_obstacle_collide()
-            self._update_screen()
-            self.clock.tick(30)
+            if profiler:
+                profiler.mark('events')
+
+            # Catch up with real time, skipping frames rather than falling behind,
+            # unless even that is not enough.
+            steps = 0
+            while lag >= step_time:
+                if steps == self.settings.max_sim_steps:
+                    lag = 0
+                    break
+                if self.game_active:
+                    self.positions = self._positions()
+                    self.step(self.action)
+                    # Jumping is a key press, while ducking lasts as long as the key is held.
+                    self.action &= ~JUMP
+                if self.ghost:
+                    self.ghost.update()
+                lag -= step_time
+                steps += 1
+            if profiler:
+                profiler.mark('update')
+
+            self._update_screen(lag / step_time)
+            if profiler:
+                profiler.mark('draw')
+            self.clock.tick(self.settings.frame_rate)
+            if profiler:
+                profiler.end()
+
+    def reset(self, seed=None):
+        '''Start a new game without waiting for player's interaction.'''
+        self._check_play_button(seed)
+
+    def step(self, action=NOOP, render=False):
+        '''Advance the game by one frame, and return whether trex is still alive.
+
+        Nothing is drawn unless render is True, and the frame rate is never limited,
+        so the game can be simulated as fast as the logic allows.
+        '''
+        if self.game_active:
+            if action & JUMP:
+                self.trex.jump = True
+            self.trex.duck = bool(action & DUCK)
+            self._update_game()
+            if self.recorder:
+                self.recorder.record(self, action)
+                if not self.game_active:
+                    self.recorder.finish(self)
+            if self.ghost:
+                self.ghost.record(action)
+            if self.leaderboard and not self.game_active:
+                self.leaderboard.add(self.scoreboard.score, self.seed)
+                if not self.headless:
+                    self.scoreboard.prepare_leaders(self.leaderboard.leaders)
+        if render:
+            self.render()
+        return self.game_active
+
+    def snapshot(self):
+        '''Return the current state of the game as a GameState, which restore can return to.
+
+        Only numbers and references to the objects of the game are copied, never images.
+        '''
+        trex = self.trex
+        settings = self.settings
+        if self.rng_state is None or self.rng_state[:2] != (self.seed, self.rng_draws):
+            self.rng_state = (self.seed, self.rng_draws, self.rng.getstate())
+        return GameState(
+            *self.rng_state, self.game_active,
+            self.obstacles, self.obstacle, self.entities.xs[:], tuple(self.active), self.next_obstacle,
+            trex.rect is trex.duck_image_rect, trex.image is trex.duck_image,
+            trex.default_image_rect.y, trex.duck_image_rect.y,
+            trex.head_rect.y, trex.feet_rect.y, trex.head_duck_rect.y,
+            trex.jump, trex.reached, trex.duck, trex.mod,
+            settings.points, settings.cactus_speed, settings.flying_lizard_speed, settings.milestone_point,
+            self.scoreboard.score, self.scoreboard.high_score,
+            [layer.offset for layer in self.background.layers],
+        )
+
+    def restore(self, state):
+        '''Return the game to a state returned by snapshot.'''
+        (seed, rng_draws, rng_state, self.game_active,
+         self.obstacles, self.obstacle, obstacle_xs, active, self.next_obstacle,
+         ducking_rect, duck_image, default_y, duck_y,
+         head_y, feet_y, head_duck_y,
+         jump, reached, duck, mod,
+         points, cactus_speed, flying_lizard_speed, milestone_point,
+         score, high_score, layer_offsets) = state
+
+        if (seed, rng_draws) != (self.seed, self.rng_draws):
+            self.seed, self.rng_draws = seed, rng_draws
+            self.rng.setstate(rng_state)
+        self.entities.xs[:] = obstacle_xs
+        # Without a stream nothing is active, and the pool is never used.
+        if self.settings.obstacle_stream:
+            self.active[:] = active
+            self._refill_pool()
+
+        trex = self.trex
+        trex.rect = trex.duck_image_rect if ducking_rect else trex.default_image_rect
+        trex.image = trex.duck_image if duck_image else trex.default_image
+        trex.default_image_rect.y = default_y
+        trex.duck_image_rect.y = duck_y
+        trex.head_rect.y = head_y
+        trex.feet_rect.y = feet_y
+        trex.head_duck_rect.y = head_duck_y
+        trex.jump, trex.reached, trex.duck, trex.mod = jump, reached, duck, mod
+
+        settings = self.settings
+        settings.points, settings.cactus_speed = points, cactus_speed
+        settings.flying_lizard_speed, settings.milestone_point = flying_lizard_speed, milestone_point
+
+        self.scoreboard.score = score
+        self.scoreboard.high_score = high_score
+        if not self.headless:
+            self.scoreboard.prepare_score()
+            self.scoreboard.prepare_high_score()
+
+        for layer, offset in zip(self.background.layers, layer_offsets):
+            layer.offset = offset
+        self.positions = None
+
+    def fast_forward(self, max_steps, margin=0):
+        '''Play up to max_steps steps without input until the next event, and return the number played.
+
+        Steps in which things only move and the score grows are played at once. It stops
+        after the step that replaces the obstacle or reaches a milestone, and before the
+        obstacle comes within margin pixels of trex's hit boxes, so a player can act in time.
+        Nothing is played if trex is not standing idle. The game ends up exactly as if step()
+        had been called once per step played.
+        '''
+        played = 0
+        while played < max_steps and self.game_active and self._trex_idle():
+            approach, passing = self._obstacle_steps(margin)
+            if not approach:
+                break
+            # Every step must be recorded, so none are skipped with a recorder.
+            steps = 0 if self.recorder else self._skip(min(max_steps - played, approach, passing))
+            played += steps
+            if not steps:
+                # The next step replaces the obstacle or reaches a milestone.
+                self.step(NOOP)
+                played += 1
+                break
+        return played
+
+    def _trex_idle(self):
+        '''Return whether trex stands on the ground, so steps without input leave it as it is.'''
+        trex = self.trex
+        return (not trex.jump and not trex.duck and trex.image is trex.default_image
+                and trex.rect is trex.default_image_rect and trex.rect.y == trex.original_y_pos)
+
+    def _obstacle_steps(self, margin):
+        '''Return how many steps the obstacles can move before one comes within margin of trex's hit boxes,
+        and before one goes past the left of the screen or anything else changes which are on it.'''
+        entities = self.entities
+        sizes = variants.sizes
+        hitbox_left = min(hitbox.left for hitbox, _ in self.trex.stand_hitboxes)
+        hitbox_right = max(hitbox.right for hitbox, _ in self.trex.stand_hitboxes)
+        approach = passing = float('inf')
+        for group in self._obstacle_groups():
+            rows = entities.groups[group]
+            speed = self.settings.speed(entities.speeds[rows.start])
+            left = min(entities.xs[i] for i in rows)
+            right = max(entities.xs[i] + sizes[entities.variants[i]][0] for i in rows)
+
+            # An obstacle that has passed trex can no longer collide.
+            if right > hitbox_left:
+                approach = min(approach, max(0, (left - hitbox_right - margin) // speed))
+
+            # _update_obstacle replaces the obstacle once the right of its last entity is past the screen.
+            last = rows[-1]
+            last_right = entities.xs[last] + sizes[entities.variants[last]][0]
+            passing = min(passing, (last_right - self.screen_rect.left) // speed)
+
+            # In a stream, the current obstacle changes once trex passes it, see _update_nearest.
+            if group == self.obstacle and self.settings.obstacle_stream:
+                passing = min(passing, (last_right - self.trex.feet_rect.left) // speed)
+
+        # The next obstacle of a stream comes in once there is room for it behind the last one.
+        if self.settings.obstacle_stream and self.pool[self.next_obstacle[0]]:
+            if not self.active:
+                return approach, 0
+            pattern, gap = self.next_obstacle
+            speed = self.settings.speed(entities.speeds[entities.groups[self.active[-1]].start])
+            passing = min(passing, max(0, (gap - self._stream_room(pattern) - 1) // speed))
+        return approach, passing
+
+    def _skip(self, steps):
+        '''Play up to steps steps in which nothing happens but movement and scoring, and return how many.
+
+        It stops before a step that would reach a milestone.
+        '''
+        settings = self.settings
+        scoreboard = self.scoreboard
+        milestone = settings.milestones[settings.milestone_point]
+
+        # The score is added up one step at a time, so it comes out exactly the same.
+        score = scoreboard.score
+        skipped = 0
+        while skipped < steps and score + settings.points < milestone:
+            score += settings.points
+            skipped += 1
+        if not skipped:
+            return 0
+
+        scoreboard.score = score
+        if score > scoreboard.high_score:
+            scoreboard.high_score = score
+        for group in self._obstacle_groups():
+            speed_class = self.entities.speeds[self.entities.groups[group].start]
+            self.entities.move(group, skipped * settings.speed(speed_class))
+        for layer in self.background.layers:
+            layer.scroll(skipped * settings.speed(layer.speed))
+        return skipped
+
+    def render(self):
+        '''Draw the current frame and return the surface it was drawn on.'''
+        if self.headless:
+            # Score images are not kept up to date while simulating headlessly.
+            self.scoreboard.prepare_score()
+            self.scoreboard.prepare_high_score()
+        self._update_screen()
+        return self.screen
+
+    def _update_game(self):
+        '''Update all game objects by one frame.'''
+        self._update_background()
+        self._update_obstacle()
+        self._update_trex_jump()
+        self.trex.duck_action()
+        if self.profiler:
+            self.profiler.call('collide', self._check_trex_obstacle_collide)
+        else:
+            self._check_trex_obstacle_collide()
 
     def _check_events(self):
         '''Check player's interaction.'''
@@ -97,120 +1260,201 @@ class DinoGame:
             if not self.game_active:
                 self._check_play_button()
             else:
-                self.trex.jump = True
+                self.action |= JUMP
         elif event.key == pygame.K_DOWN:
-            self.trex.duck = True
+            self.action |= DUCK
 
     def _check_keyup_events(self, event):
         '''Responses to key up/released events.'''
         if event.key == pygame.K_DOWN:
-            self.trex.duck = False
+            self.action &= ~DUCK
+
+    def _check_play_button(self, seed=None):
+        '''Set or reset the game to the original state when play or replay, and run the game.
+
+        The game is seeded with seed, or a new random one, so it can be replayed exactly.
+        '''
+        self.seed = seed if seed is not None else random.getrandbits(32)
+        self.rng.seed(self.seed)
+        self.rng_draws = 0
 
-    def _check_play_button(self):
-        '''Set or reset the game to the original state when play or replay, and run the game.'''
         self.settings.reset_state()
         self.trex.reset_state()
-        self.obstacles = self._create_obstacles()
+        self.entities.xs[:] = self.start_xs
+        self.obstacles = self._order_obstacles()
         self.obstacle = self.obstacles[0]
-        
+        if self.settings.obstacle_stream:
+            self.active.clear()
+            self._refill_pool()
+            self.next_obstacle = next(self.stream)
+            self._update_nearest()
+
         self.scoreboard.score = 0
         self.scoreboard.prepare_score()
 
+        self.positions = None
         self.game_active = True
 
+        if self.recorder:
+            self.recorder.start(self)
+
     def _create_obstacles(self):
-        '''Create obstacles for the game.'''
-        obstacle_types = []
-
-        # Cactus version 1
-        cactus_type = pygame.sprite.Group()
-        cactus = Cactus(self)
-        cactus_type.add(cactus)
-
-        obstacle_types.append(cactus_type)
-
-        # Cactus version 2
-        cactus_type = pygame.sprite.Group()
-        cactus = Cactus(self)
-        cactus.rescale_flip_cactus(0.8)
-        cactus_type.add(cactus)
-
-        obstacle_types.append(cactus_type)
-
-        # Cactus version 3
-        cactus_type = pygame.sprite.Group()
-        distance = 35
-        for i in range(2):
-            cactus = Cactus(self)
-            cactus.rect.x += distance * i
-            cactus_type.add(cactus)
-
-        obstacle_types.append(cactus_type)
-
-        # Cactus version 4
-        cactus_type = pygame.sprite.Group()
-        distance = 28
-        flips = (False, True)
-        for i, flip in enumerate(flips):
-            cactus = Cactus(self)
-            cactus.rescale_flip_cactus(0.8, flip)
-            cactus.rect.x += distance * i
-            cactus_type.add(cactus)
-
-        obstacle_types.append(cactus_type)
-
-        # Cactus version 5
-        cactus_type = pygame.sprite.Group()
-        distance = 28
-        flips = (False, True, False)
-        for i, flip in enumerate(flips):
-            cactus = Cactus(self)
-            cactus.rescale_flip_cactus(0.8, flip)
-            cactus.rect.x += distance * i
-            cactus_type.add(cactus)
-
-        obstacle_types.append(cactus_type)
-
-        # Cactus version 6
-        cactus_type = pygame.sprite.Group()
-        distances = (0, 37, 70, 75)
-        scales = (1, 0.9, 0.6, 1)
-        flips = (False, True, True, False)
-        for scale, flip, distance in zip(scales, flips, distances):
-            cactus = Cactus(self)
-            cactus.rescale_flip_cactus(scale, flip)
-            cactus.rect.x += distance
-            cactus_type.add(cactus)
-
-        obstacle_types.append(cactus_type)
-
-        # Flying lizard version 1, 2 & 3
-        heights = (0, 40, 80)
-        for height in heights:
-            flying_lizard_type = pygame.sprite.Group()
-            flying_lizard = FlyingLizard(self)
-            flying_lizard.rect.bottom += height
-            flying_lizard_type.add(flying_lizard)
-
-            obstacle_types.append(flying_lizard_type)
-
-        return random.sample(obstacle_types, counts=(3, 3, 3, 3, 2, 1, 1, 1, 1), k=18)
+        '''Create the groups of entities of every obstacle, at the right of the screen.
+
+        Every obstacle is created obstacle_copies times, so the stream can show copies of it at
+        once. Copy c of obstacle p is group p + c * the number of obstacles. When obstacles
+        do not come as a stream, there is one copy of each, used one at a time.
+        '''
+        entities = Entities()
+        right = self.screen_rect.right
+
+        def add_cacti(scales, flips, distances):
+            '''Add a group of cacti scaled, flipped and placed at distances from the first one.'''
+            rows = []
+            for scale, flip, distance in zip(scales, flips, distances):
+                variant = variants.image('images/cactus.png', 0.5 * scale, flip)
+                height = variants.sizes[variant][1]
+                rows.append((CACTUS, right + distance, self.screen_rect.bottom - 150 - height, variant, CACTUS_SPEED))
+            entities.add_group(rows)
+
+        for _ in range(self.obstacle_copies):
+            # Cactus version 1
+            add_cacti((1,), (False,), (0,))
+
+            # Cactus version 2
+            add_cacti((0.8,), (False,), (0,))
+
+            # Cactus version 3
+            add_cacti((1, 1), (False, False), (0, 35))
+
+            # Cactus version 4
+            add_cacti((0.8, 0.8), (False, True), (0, 28))
+
+            # Cactus version 5
+            add_cacti((0.8, 0.8, 0.8), (False, True, False), (0, 28, 56))
+
+            # Cactus version 6
+            add_cacti((1, 0.9, 0.6, 1), (False, True, True, False), (0, 37, 70, 75))
+
+            # Flying lizard version 1, 2 & 3
+            variant = variants.image('images/flying_lizard.png', 0.5)
+            height = variants.sizes[variant][1]
+            for bottom in (0, 40, 80):
+                y = self.screen_rect.bottom - 230 + bottom - height
+                entities.add_group([(FLYING_LIZARD, right, y, variant, FLYING_LIZARD_SPEED)])
+
+        return entities
+
+    def _order_obstacles(self):
+        '''Return ids of obstacle groups in random order, repeating the more common ones.'''
+        return self.rng.sample(range(self.patterns), counts=(3, 3, 3, 3, 2, 1, 1, 1, 1), k=18)
+
+    def _obstacle_stream(self):
+        '''Yield each next obstacle of the stream, with the gap in pixels to leave before it.
+
+        Obstacles are as common as in _order_obstacles. Gaps last fewer steps with each
+        milestone, but never fewer than a jump, so trex can always land between two obstacles.
+        '''
+        settings = self.settings
+        entities = self.entities
+        while True:
+            pattern = self.rng.choice(self.obstacles)
+            scale = self.rng.uniform(1, settings.max_gap_scale)
+            self.rng_draws += 2
+            steps = max(self.trex.jump_steps(), settings.obstacle_gap / settings.speedup_scale ** settings.milestone_point)
+            speed = settings.speed(entities.speeds[entities.groups[pattern].start])
+            yield pattern, round(steps * scale * speed)
+
+    def _obstacle_groups(self):
+        '''Return the groups of the obstacles on screen.'''
+        return self.active if self.settings.obstacle_stream else (self.obstacle,)
+
+    def _refill_pool(self):
+        '''Put every copy of each obstacle that is not on screen into the pool.'''
+        active = self.active
+        for pattern, free in enumerate(self.pool):
+            free[:] = [group for group in range(pattern, len(self.entities.groups), self.patterns)
+                       if group not in active]
+
+    def _stream_room(self, pattern):
+        '''Return the space in pixels between the last obstacle of the stream and the right of the screen,
+        less what obstacle pattern would gain on it while crossing the screen if faster.'''
+        if not self.active:
+            return float('inf')
+        entities = self.entities
+        settings = self.settings
+        last = entities.groups[self.active[-1]]
+        right = entities.xs[last[-1]] + variants.sizes[entities.variants[last[-1]]][0]
+        speed = settings.speed(entities.speeds[last.start])
+        next_speed = settings.speed(entities.speeds[entities.groups[pattern].start])
+        gain = max(0, next_speed - speed) * self.screen_rect.width // next_speed
+        return self.screen_rect.right - right - gain
+
+    def _update_stream(self):
+        '''Move the obstacles of the stream, put those past the screen back into the pool, and bring in the next.'''
+        entities = self.entities
+        settings = self.settings
+        sizes = variants.sizes
+        active = self.active
+        for group in active:
+            entities.move(group, settings.speed(entities.speeds[entities.groups[group].start]))
+
+        i = 0
+        while i < len(active):
+            rows = entities.groups[active[i]]
+            last = rows[-1]
+            if entities.xs[last] + sizes[entities.variants[last]][0] < self.screen_rect.left:
+                group = active.pop(i)
+                entities.move(group, entities.xs[rows.start] - self.start_xs[rows.start])
+                self.pool[group % self.patterns].append(group)
+            else:
+                i += 1
+
+        # The lowest free copy is taken, so the copies in use follow from the obstacles alone.
+        pattern, gap = self.next_obstacle
+        free = self.pool[pattern]
+        if free and self._stream_room(pattern) >= gap:
+            group = min(free)
+            free.remove(group)
+            active.append(group)
+            self.next_obstacle = next(self.stream)
+        self._update_nearest()
+
+    def _update_nearest(self):
+        '''Make the nearest obstacle of the stream that trex has not passed the current one,
+        or if there is none, the one coming next.'''
+        entities = self.entities
+        sizes = variants.sizes
+        left = self.trex.feet_rect.left
+        for group in self.active:
+            last = entities.groups[group][-1]
+            if entities.xs[last] + sizes[entities.variants[last]][0] >= left:
+                self.obstacle = group
+                return
+        free = self.pool[self.next_obstacle[0]]
+        if free:
+            self.obstacle = min(free)
 
     def _update_obstacle(self):
         '''Update obstacle and scoring.'''
-        self.obstacle.update()
-        sprites = self.obstacle.sprites()
-        # If the obstacle goes pass the left of the screen,
-        # reset its position to the right of the screen and choose the next obstacle.
-        if sprites[-1].rect.right < self.screen_rect.left:
-            move_distance = self.screen_rect.right - sprites[0].rect.left
-            for sprite in sprites:
-                sprite.rect.left += move_distance
-            self.obstacle = random.choice(self.obstacles)
+        if self.settings.obstacle_stream:
+            self._update_stream()
+        else:
+            entities = self.entities
+            rows = entities.groups[self.obstacle]
+            entities.move(self.obstacle, self.settings.speed(entities.speeds[rows.start]))
+            # If the obstacle goes pass the left of the screen,
+            # reset its position to the right of the screen and choose the next obstacle.
+            last = rows[-1]
+            if entities.xs[last] + variants.sizes[entities.variants[last]][0] < self.screen_rect.left:
+                entities.move(self.obstacle, entities.xs[rows.start] - self.screen_rect.right)
+                self.obstacle = self.rng.choice(self.obstacles)
+                self.rng_draws += 1
 
         # Update score, as well as check for new high score and milestone.
         self.scoreboard.score += self.settings.points
-        self.scoreboard.prepare_score()
+        if not self.headless:
+            self.scoreboard.prepare_score()
         self.scoreboard.check_high_score()
         self._check_milestone()
 
@@ -239,71 +1483,103 @@ class DinoGame:
     
     def _check_trex_obstacle_collide(self):
         '''Check for collision between trex and obstacle.'''
-        collide_dict = {'Cactus': [], 'FlyingLizard': []}
-        for sprite in self.obstacle.sprites():
-            # The below variable is only used for cactus to help get the appropriate
-            # coordinate of each cactus because of the different sizes of cactuses.
-            scale = sprite.rect.width / 80
-
-            # Specify collide points for cactus and flying lizard.
-            if sprite.__class__.__name__ == 'Cactus':
-                collide_point_1 = (sprite.rect.centerx, sprite.rect.centery - int(35 * scale))
-                collide_point_2 = (sprite.rect.centerx - int(13 * scale), sprite.rect.centery - int(22 * scale))
-                collide_point_3 = (sprite.rect.centerx, sprite.rect.centery + int(10 * scale))
-                collide_dict['Cactus'].append(collide_point_1)
-                collide_dict['Cactus'].append(collide_point_2)
-                collide_dict['Cactus'].append(collide_point_3)
-            elif sprite.__class__.__name__ == 'FlyingLizard':
-                collide_point_1 = (sprite.rect.centerx - 28, sprite.rect.centery - 16)
-                collide_point_2 = (sprite.rect.centerx - 6, sprite.rect.centery + 15)
-                collide_point_3 = (sprite.rect.centerx + 26, sprite.rect.centery - 2)
-                collide_dict['FlyingLizard'].append(collide_point_1)
-                collide_dict['FlyingLizard'].append(collide_point_2)
-                collide_dict['FlyingLizard'].append(collide_point_3)
-
-            for type in collide_dict:
-                for i, collide_point in enumerate(collide_dict[type]):
-                    if not self.trex.duck:
-                        if self.trex.head_rect.collidepoint(collide_point):
-                            self.game_active = False
-                            #self.pcollide = collide_point
-                            #print('head', collide_point, i, self.trex.head_rect, sprite.rect)
-                        elif self.trex.feet_rect.collidepoint(collide_point):
-                            self.game_active = False
-                            #self.pcollide = collide_point
-                            #print('feet', collide_point, i, self.trex.feet_rect, sprite.rect)
-                    else:
-                        if self.trex.head_duck_rect.collidepoint(collide_point):
-                            self.game_active = False
-                            #self.pcollide = collide_point
-                            #print('head_duck', collide_point, i, self.trex.head_rect, sprite.rect)
-
-                    # The game is over when a collision happens.
-                    if not self.game_active:
-                        self.play_button.prepare_msg(' '.join('GAME OVER'), 'Press space to replay')
-                        break
+        hitboxes = self.trex.hitboxes()
+        entities = self.entities
+        for group in self._obstacle_groups():
+            for i in entities.groups[group]:
+                x, y, variant = entities.xs[i], entities.ys[i], entities.variants[i]
+                width, height = variants.sizes[variant]
+                for hitbox, mask in hitboxes:
+                    # Check bounding rects first, and only then whether any pixels overlap.
+                    if (hitbox.colliderect(x, y, width, height)
+                            and variants.masks[variant].overlap(mask, (hitbox.x - x, hitbox.y - y))):
+                        # The game is over when a collision happens.
+                        self.game_active = False
+                        self._show_game_over()
+                        return
+
+    def _show_game_over(self):
+        '''Prepare the messages shown when the game is over.'''
+        self.play_button.prepare_msg(' '.join('GAME OVER'), 'Press space to replay')
 
     def _update_background(self):
         '''Update background of the game.'''
         self.background.update()
-        if self.background.moon.rect.right < self.screen_rect.left:
-            self.background.moon.rect.left = self.screen_rect.right
-        for sprite in self.background.clouds.sprites():
-            if sprite.rect.right < self.screen_rect.left:
-                sprite.rect.left = self.screen_rect.right
-        for sprite in self.background.stars.sprites():
-            if sprite.rect.right < self.screen_rect.left:
-                sprite.rect.left = self.screen_rect.right
-        for stone in self.background.stones:
-            if stone.rect.right < self.screen_rect.left:
-                stone.rect.left = self.screen_rect.right
-
-    def _update_screen(self):
-        '''Draw all objects to the screen.'''
+
+    def _update_screen(self, alpha=1):
+        '''Draw all objects to the screen.
+
+        With alpha below 1, moving objects are drawn that fraction of the way from
+        their previous positions to their current ones.
+        '''
+        positions = self._interpolate(alpha)
+        self._update_fade()
+        fading = 0 < self.fade_frame < self.settings.fade_frames
+        if self.settings.dirty_rects and not self.headless and not fading:
+            self._update_dirty_screen()
+        elif self.fade_frame:
+            self._draw_inverted_screen()
+        else:
+            self._draw_screen()
+        if positions:
+            self._restore_positions(positions)
+
+    def _positions(self):
+        '''Return current positions of trex, obstacles and background layers.'''
+        xs = self.entities.xs
+        groups = tuple(self._obstacle_groups())
+        return (
+            self.trex.rect,
+            self.trex.rect.y,
+            groups,
+            [xs[i] for group in groups for i in self.entities.groups[group]],
+            [layer.offset for layer in self.background.layers],
+        )
+
+    def _interpolate(self, alpha):
+        '''Move objects alpha of the way from their previous positions, and return their current ones.'''
+        if alpha >= 1 or not self.positions or not self.game_active:
+            return None
+        current = self._positions()
+        rect, y, groups, xs, offsets = self.positions
+
+        # Objects that were replaced or jumped back to the right of the screen stay put.
+        if rect is self.trex.rect:
+            rect.y = round(y + (rect.y - y) * alpha)
+        current_groups = current[2]
+        current_xs = self.entities.xs
+        xs = iter(xs)
+        for group in groups:
+            for i in self.entities.groups[group]:
+                x = next(xs)
+                if group in current_groups and current_xs[i] <= x:
+                    current_xs[i] = round(x + (current_xs[i] - x) * alpha)
+        for layer, offset in zip(self.background.layers, offsets):
+            distance = (layer.offset - offset) % layer.rect.width
+            layer.offset = round(offset + distance * alpha) % layer.rect.width
+        return current
+
+    def _restore_positions(self, positions):
+        '''Move objects back to the positions returned by _positions.'''
+        rect, y, groups, xs, offsets = positions
+        rect.y = y
+        rows = (i for group in groups for i in self.entities.groups[group])
+        for i, x in zip(rows, xs):
+            self.entities.xs[i] = x
+        for layer, offset in zip(self.background.layers, offsets):
+            layer.offset = offset
+
+    def _draw_screen(self):
+        '''Fill the screen, draw all objects and flip the display.'''
         self.screen.fill(self.settings.bg_color)
         self.background.draw()
+        if self.ghost:
+            for image, rect in self.ghost.drawables():
+                self.screen.blit(image, rect)
         self.trex.draw()
-        self.obstacle.draw(self.screen)
+        for group in self._obstacle_groups():
+            for image, rect in self.entities.drawables(group):
+                self.screen.blit(image, rect)
         self.scoreboard.draw()
 
         # The commented code is only used for testing.
@@ -316,8 +1592,207 @@ class DinoGame:
 
         if not self.game_active:
             self.play_button.draw()
-
-        pygame.display.flip()
+            self.scoreboard.draw_leaders()
+
+        if self.profiler and self.profiler.overlay:
+            self.profiler.draw()
+
+        if not self.headless:
+            self._flip()
+
+    def _invert_images(self):
+        '''Make the inverted copy of every image of the game, so none is made while playing.'''
+        images = [image for image in variants.images if not isinstance(image, tuple)]
+        # Texts are rendered in the inverted color when prepared, see GlyphAtlas.text.
+        images += [self.trex.default_image, self.trex.duck_image]
+        images += [layer.image for layer in self.background.layers]
+        for image in images:
+            inverted_images.get(image)
+
+    def _update_fade(self):
+        '''Fade a frame further towards inverted colors after every other milestone, and back after the others.'''
+        settings = self.settings
+        night = settings.day_night and settings.milestone_point % 2
+        if night and self.fade_frame < settings.fade_frames:
+            self.fade_frame += 1
+        elif not night and self.fade_frame:
+            self.fade_frame -= 1
+        else:
+            return
+        # Everything changes color, so dirty rect rendering starts over.
+        self.drawn = None
+
+    def _draw_inverted_screen(self):
+        '''Draw all objects with inverted colors, over the normal colors by how far faded.
+
+        The inverted images are made once, and fading only blends the two frames.
+        '''
+        drawables = self._drawables()
+        surface = self.screen
+        fading = self.fade_frame < self.settings.fade_frames
+        if fading:
+            self.screen.fill(self.settings.bg_color)
+            self._draw_drawables(drawables)
+            if self.fade_screen is None:
+                self.fade_screen = pygame.Surface(self.screen.get_size(), 0, self.screen)
+            surface = self.fade_screen
+        surface.fill(invert_color(self.settings.bg_color))
+        self._draw_drawables(inverted_images.drawables(drawables), surface=surface)
+        if fading:
+            surface.set_alpha(round(255 * self.fade_frame / self.settings.fade_frames))
+            self.screen.blit(surface, (0, 0))
+        if not self.headless:
+            self._flip()
+
+    def _update_dirty_screen(self):
+        '''Redraw only the parts of the screen that changed, and update just those on the display.'''
+        drawables = self._drawables()
+        bg_color = self.settings.bg_color
+        if self.fade_frame:
+            drawables = inverted_images.drawables(drawables)
+            bg_color = invert_color(bg_color)
+        # Images are blitted at the top left of their rect whatever its size, such as the duck
+        # image at the rect of trex standing, so what they cover is the rect of the image there.
+        drawables = [
+            (image, rect if isinstance(image, tuple) else image.get_rect(topleft=rect[:2]))
+            for image, rect in drawables
+        ]
+        drawn = {(image, tuple(rect)) for image, rect in drawables}
+        composed = list(self.scoreboard.composed)
+        self.scoreboard.composed.clear()
+
+        # The whole screen is drawn the first time.
+        if self.drawn is None:
+            self.screen.fill(bg_color)
+            self._draw_drawables(drawables)
+            self._flip()
+            self.drawn = drawn
+            return
+
+        # Anything that moved, appeared, disappeared or changed image makes its rect dirty,
+        # and so do scores drawn again into the images shown.
+        changed = [rect for _, rect in drawn ^ self.drawn] + composed
+        dirty = self._merge_rects(self.screen_rect.clip(rect) for rect in changed)
+        self.drawn = drawn
+        for rect in dirty:
+            self.screen.set_clip(rect)
+            self.screen.fill(bg_color, rect)
+            self._draw_drawables(drawables, rect)
+        self.screen.set_clip(None)
+        self._flip(dirty)
+
+    def _open_window(self):
+        '''Open the window, and make the screen to draw on, which is the window unless it is scaled.'''
+        settings = self.settings
+        size = (settings.screen_width, settings.screen_height)
+        flags = pygame.FULLSCREEN if settings.fullscreen else 0
+        if not settings.window_size and not settings.fullscreen:
+            self.screen = pygame.display.set_mode(size)
+            return
+        if settings.scale_mode == 'gpu':
+            # The display surface stays the size of the screen, and presenting it scales it
+            # to the window, which SDL opens at a multiple of the screen until it is resized.
+            self.screen = pygame.display.set_mode(size, flags | pygame.SCALED)
+            if settings.window_size and not settings.fullscreen:
+                Window.from_display_module().size = settings.window_size
+            return
+
+        window = pygame.display.set_mode(settings.window_size or (0, 0), flags)
+        if window.get_size() == size:
+            self.screen = window
+            return
+        self.window = window
+        self.screen = pygame.Surface(size, 0, window)
+
+        width, height = window.get_size()
+        if settings.scale_mode == 'stretch':
+            area = window.get_rect()
+        else:
+            scale = min(width / size[0], height / size[1])
+            if settings.scale_mode == 'integer' and scale >= 1:
+                scale = self.scale = int(scale)
+            area = pygame.Rect(0, 0, round(size[0] * scale), round(size[1] * scale))
+            area.center = window.get_rect().center
+        window.fill((0, 0, 0))
+        # The screen is scaled straight into the window's own pixels, with nothing allocated per frame.
+        self.target = window.subsurface(area)
+
+    def _present(self, rects=None):
+        '''Scale the screen into the window, only the rects if given and the scale is whole, and return
+        the rects of the window to update.'''
+        target = self.target
+        if rects is None or not self.scale:
+            pygame.transform.scale(self.screen, target.get_size(), target)
+            return None
+        scale = self.scale
+        updated = []
+        for rect in rects:
+            area = pygame.Rect(rect.x * scale, rect.y * scale, rect.width * scale, rect.height * scale)
+            pygame.transform.scale(self.screen.subsurface(rect), area.size, target.subsurface(area))
+            updated.append(area.move(target.get_offset()))
+        return updated
+
+    def _flip(self, rects=None):
+        '''Update the display, only the rects if given, or all of it.'''
+        start = time.perf_counter() if self.profiler else 0
+        if self.window:
+            rects = self._present(rects)
+        if rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+        if self.profiler:
+            self.profiler.add('flip', time.perf_counter() - start)
+        if self.capture:
+            self.capture.add(self.screen)
+
+    def _drawables(self):
+        '''Return what is drawn on the screen from back to front, as pairs of image and rect.
+
+        Instead of an image, a color means the rect is filled with it.
+        '''
+        drawables = self.background.drawables()
+        if self.ghost:
+            drawables.extend(self.ghost.drawables())
+        drawables.append((self.trex.image, self.trex.rect))
+        for group in self._obstacle_groups():
+            drawables.extend(self.entities.drawables(group))
+        drawables.append((self.scoreboard.score_img, self.scoreboard.score_img_rect))
+        drawables.append((self.scoreboard.high_score_img, self.scoreboard.high_score_img_rect))
+        if not self.game_active:
+            drawables.append((self.play_button.msg_img, self.play_button.msg_img_rect))
+            drawables.extend(self.scoreboard.leader_imgs)
+            if hasattr(self.play_button, 'submsg_img'):
+                drawables.append((self.play_button.submsg_img, self.play_button.submsg_img_rect))
+        if self.profiler and self.profiler.overlay:
+            drawables.append((self.profiler.overlay_img, self.profiler.overlay_img_rect))
+        return drawables
+
+    def _draw_drawables(self, drawables, area=None, surface=None):
+        '''Draw drawables onto surface, the screen by default, or only the ones overlapping area if given.'''
+        if surface is None:
+            surface = self.screen
+        for image, rect in drawables:
+            if area and not area.colliderect(rect):
+                continue
+            if isinstance(image, tuple):
+                pygame.draw.rect(surface, image, rect)
+            else:
+                surface.blit(image, rect)
+
+    @staticmethod
+    def _merge_rects(rects):
+        '''Merge overlapping rects, so no part of the screen is redrawn twice.'''
+        merged = []
+        for rect in rects:
+            if not rect:
+                continue
+            i = rect.collidelist(merged)
+            while i != -1:
+                rect.union_ip(merged.pop(i))
+                i = rect.collidelist(merged)
+            merged.append(rect)
+        return merged
 
 class Trex:
     '''A class to represent T-rex.'''
@@ -328,15 +1803,13 @@ class Trex:
         self.settings = game.settings
 
         # Load trex's default image and set its rect.
-        self.default_image = pygame.image.load(Path('images/default_trex.png'))
-        self.default_image = pygame.transform.scale_by(self.default_image, 0.5)
+        self.default_image = assets.get('images/default_trex.png', 0.5)
         self.default_image_rect = self.default_image.get_rect()
         self.default_image_rect.x = self.screen_rect.x + 20
         self.default_image_rect.bottom = self.screen_rect.bottom - 150
 
         # Load trex's duck image and set its rect.
-        self.duck_image = pygame.image.load(Path('images/duck_trex.png'))
-        self.duck_image = pygame.transform.scale_by(self.duck_image, 0.6)
+        self.duck_image = assets.get('images/duck_trex.png', 0.6)
         self.duck_image_rect = self.duck_image.get_rect()
         self.duck_image_rect.x = self.screen_rect.x + 20
         self.duck_image_rect.bottom = self.screen_rect.bottom - 150
@@ -349,6 +1822,11 @@ class Trex:
         # Hit box of duck trex
         self.head_duck_rect = pygame.Rect(self.duck_image_rect.centerx - 26, self.duck_image_rect.centery + 6, 64, 22)
 
+        # Collision masks filling the hit boxes.
+        self.head_mask = pygame.mask.Mask(self.head_rect.size, fill=True)
+        self.feet_mask = pygame.mask.Mask(self.feet_rect.size, fill=True)
+        self.head_duck_mask = pygame.mask.Mask(self.head_duck_rect.size, fill=True)
+
         # The below attribute is only used to modify the position of images
         # because of the different sizes between the default and duck images.
         self.mod = False
@@ -360,6 +1838,10 @@ class Trex:
         self.original_y_pos = self.rect.y
         self.max_jump_height = self.original_y_pos - self.rect.height * 2
 
+    def jump_steps(self):
+        '''Return the number of steps a jump lasts.'''
+        return 2 * -(-(self.original_y_pos - self.max_jump_height) // self.settings.trex_jump_speed)
+
     def jump_action(self, direction):
         '''Update jump action, as well as the relevant hit boxes.'''
         self.rect.y -= self.settings.trex_jump_speed * direction
@@ -395,85 +1877,33 @@ class Trex:
 
     def reset_state(self):
         '''Set or reset settings to original state.'''
+        # Either rect may have been left in the air by a game that ended mid jump.
+        for rect in (self.default_image_rect, self.duck_image_rect):
+            rect.x = self.screen_rect.x + 20
+            rect.bottom = self.screen_rect.bottom - 150
         self.rect = self.default_image_rect
-        self.rect.x = self.screen_rect.x + 20
-        self.rect.bottom = self.screen_rect.bottom - 150
 
         self.head_rect = pygame.Rect(self.default_image_rect.centerx, self.default_image_rect.centery - 35, 27, 24)
         self.feet_rect = pygame.Rect(self.default_image_rect.centerx - 20, self.default_image_rect.centery + 2, 26, 33)
 
         self.head_duck_rect = pygame.Rect(self.duck_image_rect.centerx - 26, self.duck_image_rect.centery + 6, 64, 22)
 
+        # Hit boxes paired with their masks, for standing and ducking trex.
+        self.stand_hitboxes = ((self.head_rect, self.head_mask), (self.feet_rect, self.feet_mask))
+        self.duck_hitboxes = ((self.head_duck_rect, self.head_duck_mask),)
+
         self.jump = False
         self.reached = False
         self.duck = False
 
         self.mod = False
 
-    def draw(self):
-        '''Draw trex.'''
-        self.screen.blit(self.image, self.rect)
-
-class FlyingLizard(pygame.sprite.Sprite):
-    '''A class to represent flying lizard.'''
-    def __init__(self, game):
-        '''Initialize flying lizard.'''
-        super().__init__()
-        self.screen = game.screen
-        self.screen_rect = self.screen.get_rect()
-        self.settings = game.settings
-
-        # Load image and set its rect
-        self.image = pygame.image.load(Path('images/flying_lizard.png'))
-        self.image = pygame.transform.scale_by(self.image, 0.5)
-        self.rect = self.image.get_rect()
-        self.reset_state()
-
-    def update(self):
-        '''Update horizontal position.'''
-        self.rect.x -= self.settings.flying_lizard_speed
-
-    def reset_state(self):
-        '''Set or reset settings to original state.'''
-        self.rect.left = self.screen_rect.right
-        self.rect.bottom = self.screen_rect.bottom - 230
+    def hitboxes(self):
+        '''Return hit boxes of trex and their masks for the current pose.'''
+        return self.duck_hitboxes if self.duck else self.stand_hitboxes
 
     def draw(self):
-        '''Draw flying lizard.'''
-        self.screen.blit(self.image, self.rect)
-
-class Cactus(pygame.sprite.Sprite):
-    '''A class to represent cactus.'''
-    def __init__(self, game):
-        '''Initialize cactus.'''
-        super().__init__()
-        self.screen = game.screen
-        self.screen_rect = self.screen.get_rect()
-        self.settings = game.settings
-
-        # Load image and set its rect.
-        self.image = pygame.image.load(Path('images/cactus.png'))
-        self.rescale_flip_cactus(0.5)
-        
-    def rescale_flip_cactus(self, factor, flip=False):
-        '''Rescale and/or flip horizontally image and reset its rect.'''
-        self.image = pygame.transform.scale_by(self.image, factor)
-        if flip:
-            self.image = pygame.transform.flip(self.image, flip_x=True, flip_y=False)
-        self.rect = self.image.get_rect()
-        self.reset_state()
-
-    def update(self):
-        '''Update horizontal position'''
-        self.rect.x -= self.settings.cactus_speed
-
-    def reset_state(self):
-        '''Set or reset settings to original state.'''
-        self.rect.left = self.screen_rect.right
-        self.rect.bottom = self.screen_rect.bottom - 150
-
-    def draw(self):
-        '''Draw cactus.'''
+        '''Draw trex.'''
         self.screen.blit(self.image, self.rect)
 
 class Scoreboard:
@@ -483,131 +1913,176 @@ class Scoreboard:
         self.screen = game.screen
         self.screen_rect = self.screen.get_rect()
         self.settings = game.settings
+        self.headless = game.headless
 
         self.text_color = (100, 100, 100)
-        self.font = self.settings.get_font(size=32)
+        self.atlas = self.settings.get_atlas(size=32, color=self.text_color)
+        # Score images are drawn in inverted colors too, for the day and night cycle.
+        self.inverted_atlas = self.atlas.inverted
 
         self.score = 0
         self.high_score = 0
 
+        # The rounded scores shown by the current images, and pairs of reusable
+        # images with the text drawn on each of them.
+        self.shown_score = None
+        self.shown_high_score = None
+        self.score_imgs = [[None, None], [None, None]]
+        self.high_score_imgs = [[None, None], [None, None]]
+        # Rects of score images composed since the last dirty rect frame, see _compose.
+        self.composed = set()
+
+        # Images and rects of the lines of top scores shown between games, if any.
+        self.leader_imgs = []
+
         self.prepare_score()
         self.prepare_high_score()
 
     def prepare_score(self):
-        '''Prepare score to draw.'''
-        self.score_img = self.font.render(f'{round(self.score):05}', True, self.text_color)
+        '''Prepare score to draw, if the shown score has changed.'''
+        score = round(self.score)
+        if score == self.shown_score:
+            return
+        self.shown_score = score
+        self.score_img = self._compose(f'{score:05}', self.score_imgs)
         self.score_img_rect = self.score_img.get_rect()
         self.score_img_rect.right = self.screen_rect.right - 20
         self.score_img_rect.top = self.screen_rect.top + 20
+        self.composed.add(tuple(self.score_img_rect))
 
     def prepare_high_score(self):
-        '''Prepare high score to draw.'''
-        self.high_score_img = self.font.render(f'HI {round(self.high_score):05}', True, self.text_color)
+        '''Prepare high score to draw, if the shown high score has changed.'''
+        high_score = round(self.high_score)
+        composed = high_score != self.shown_high_score
+        if composed:
+            self.shown_high_score = high_score
+            self.high_score_img = self._compose(f'HI {high_score:05}', self.high_score_imgs)
         self.high_score_img_rect = self.high_score_img.get_rect()
         self.high_score_img_rect.right = self.score_img_rect.left - 20
         self.high_score_img_rect.top = self.screen_rect.top + 20
+        if composed:
+            self.composed.add(tuple(self.high_score_img_rect))
+
+    def load(self, leaderboard):
+        '''Start from the best score of the player of leaderboard, and show its top scores between games.'''
+        self.high_score = max(self.high_score, leaderboard.best)
+        self.prepare_high_score()
+        self.prepare_leaders(leaderboard.leaders)
+
+    def prepare_leaders(self, leaders):
+        '''Prepare the lines of leaders, tuples of player, score and time played, to draw.'''
+        atlas = self.settings.get_atlas(size=16, color=self.text_color)
+        self.leader_imgs = []
+        top = self.screen_rect.top + 20
+        for rank, (player, score, _) in enumerate(leaders, 1):
+            image = atlas.text(f'{rank:2} {player[:12]:12} {round(score):05}')
+            rect = image.get_rect(left=self.screen_rect.left + 20, top=top)
+            self.leader_imgs.append((image, rect))
+            top = rect.bottom + 4
+
+    def _compose(self, text, images):
+        '''Draw text into the older one of a pair of images, and return it.
+
+        Alternating between two images means a changed score is also a different
+        image, which is how dirty rect rendering notices the change. Composed twice
+        between two frames, the image drawn last comes back, so the rects composed
+        are kept in composed for dirty rect rendering as well.
+        '''
+        images.reverse()
+        image, previous = images[0]
+        if image is None or len(previous) != len(text):
+            image, previous = self.atlas.blank(text), None
+            if self.inverted_atlas:
+                inverted_images.add(image, self.inverted_atlas.blank(text))
+        self.atlas.draw(image, text, previous=previous)
+        if self.inverted_atlas:
+            self.inverted_atlas.draw(inverted_images.get(image), text, previous=previous)
+        images[0] = [image, text]
+        return image
 
     def check_high_score(self):
         '''Check for new high score.'''
         if self.score > self.high_score:
             self.high_score = self.score
-            self.prepare_high_score()
+            if not self.headless:
+                self.prepare_high_score()
 
     def draw(self):
         '''Draw score and high score'''
         self.screen.blit(self.score_img, self.score_img_rect)
         self.screen.blit(self.high_score_img, self.high_score_img_rect)
 
-class Cloud(pygame.sprite.Sprite):
-    '''A class to represent cloud.'''
-    def __init__(self, game):
-        '''Initialize cloud.'''
-        super().__init__()
-        self.screen = game.screen
-        self.screen_rect = self.screen.get_rect()
+    def draw_leaders(self):
+        '''Draw the lines of top scores.'''
+        for image, rect in self.leader_imgs:
+            self.screen.blit(image, rect)
 
-        # Load image and set its rect.
-        self.image = pygame.image.load(Path('images/cloud.png'))
-        self.image = pygame.transform.scale_by(self.image, 0.5)
-        self.image.set_alpha(50)
-        self.rect = self.image.get_rect()
-        self.rect.x = self.screen_rect.x + 50
-        self.rect.y = self.screen_rect.y
-
-    def update(self):
-        '''Update horizontal position.'''
-        self.rect.x -= 2
-
-    def draw(self):
-        '''Draw cloud.'''
-        self.screen.blit(self.image, self.rect)
-
-class Moon:
-    '''A class to represent moon.'''
-    def __init__(self, game):
-        '''Initialize moon.'''
-        self.screen = game.screen
-        self.screen_rect = self.screen.get_rect()
-
-        # Load image and set its rect.
-        self.image = pygame.image.load(Path('images/moon.png'))
-        self.image = pygame.transform.scale_by(self.image, 0.5)
-        self.image.set_alpha(100)
-        self.rect = self.image.get_rect()
-        self.rect.x = self.screen_rect.x + 700
-        self.rect.y = self.screen_rect.y + 75
-
-    def update(self):
-        '''Update horizontal position.'''
-        self.rect.x -= 1
-
-    def draw(self):
-        '''Draw moon.'''
-        self.screen.blit(self.image, self.rect)
-
-class Star(pygame.sprite.Sprite):
-    '''A class to represent star.'''
-    def __init__(self, game):
-        '''Initialize star.'''
-        super().__init__()
+class ParallaxLayer:
+    '''A class to represent a horizontal band of background that scrolls and repeats.'''
+    def __init__(self, game, items, speed):
+        '''Initialize layer moving at a speed class, with items given as pairs of image (or color) and rect.'''
         self.screen = game.screen
         self.screen_rect = self.screen.get_rect()
+        self.speed = speed
 
-        # Load image and set its rect.
-        self.image = pygame.image.load(Path('images/star.png'))
-        self.image = pygame.transform.scale_by(self.image, 0.1)
-        self.image.set_alpha(100)
-        self.rect = self.image.get_rect()
-        self.rect.x = self.screen_rect.x + 200
-        self.rect.y = self.screen_rect.y + 50
-
-    def update(self):
-        '''Update horizontal position.'''
-        self.rect.x -= 1
-
-    def draw(self):
-        '''Draw star.'''
-        self.screen.blit(self.image, self.rect)
-
-class Stone():
-    '''A class to represent stone'''
-    def __init__(self, game, width=2, height=2):
-        '''Initialize stone.'''
-        self.screen = game.screen
-        self.screen_rect = self.screen.get_rect()
-        self.settings = game.settings
-
-        self.rect = pygame.Rect(0, 0, width, height)
+        # The layer spans the screen width and the height of its items.
+        self.rect = pygame.Rect(items[0][1]).unionall([pygame.Rect(rect) for _, rect in items])
         self.rect.x = self.screen_rect.x
-        self.rect.y = self.screen_rect.y
-
-    def update(self):
-        '''Update horizontal position'''
-        self.rect.x -= self.settings.cactus_speed
+        self.rect.width = self.screen_rect.width
+
+        # Games with the same items share the image of the layer.
+        key = (tuple(self.rect), bool(pygame.display.get_surface()), tuple(items))
+        self.image = layer_images.get(key)
+        if self.image is None:
+            self._create_image(items)
+            layer_images[key] = self.image
+
+        self.offset = 0
+
+    def _create_image(self, items):
+        '''Draw items into a new image of the layer.'''
+        self.image = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        if pygame.display.get_surface():
+            self.image = self.image.convert_alpha()
+        self.image.fill((0, 0, 0, 0))
+        for image, rect in items:
+            rect = pygame.Rect(rect).move(-self.rect.x, -self.rect.y)
+            rect.x %= self.rect.width
+            # Items crossing the right edge continue at the left edge.
+            self._add(image, rect)
+            if rect.right > self.rect.width:
+                self._add(image, rect.move(-self.rect.width, 0))
+        # Layers are mostly transparent, so run-length encoding skips most of their pixels.
+        self.image.set_alpha(255, pygame.RLEACCEL)
+
+    def _add(self, image, rect):
+        '''Draw an item into the layer, keeping its pixels as they would be drawn on screen.'''
+        if isinstance(image, tuple):
+            pygame.draw.rect(self.image, image, rect)
+            return
+
+        # Fold the alpha of the whole image into its pixels, then copy the pixels
+        # into the transparent layer instead of blending them with it.
+        alpha = image.get_alpha()
+        if alpha is not None and alpha < 255:
+            image = image.copy()
+            image.set_alpha(255)
+            image.fill((255, 255, 255, alpha), special_flags=pygame.BLEND_RGBA_MULT)
+        self.image.blit(image, rect, special_flags=pygame.BLEND_RGBA_MAX)
+
+    def scroll(self, distance):
+        '''Scroll layer to the left by distance.'''
+        self.offset = (self.offset + distance) % self.rect.width
+
+    def drawables(self):
+        '''Return the two pieces of the layer on screen as pairs of image and rect.'''
+        left = self.rect.move(-self.offset, 0)
+        return [(self.image, left), (self.image, left.move(self.rect.width, 0))]
 
     def draw(self):
-        '''Draw stone.'''
-        pygame.draw.rect(self.screen, (100, 100, 100), self.rect)
+        '''Draw layer.'''
+        self.screen.blit(self.image, (self.rect.x - self.offset, self.rect.y))
+        self.screen.blit(self.image, (self.rect.x - self.offset + self.rect.width, self.rect.y))
 
 class Background:
     '''A class to control all the background components.'''
@@ -615,65 +2090,82 @@ class Background:
         '''Initialize background'''
         self.screen = game.screen
         self.settings = game.settings
+        self.rng = game.rng
 
-        self.moon = Moon(self)
+        # Scenery is kept as entities only until it is drawn into layers.
+        self.scenery = Entities()
+        self.add_moon()
         self.add_clouds()
         self.add_stars()
 
         self.road = pygame.Rect(0, 290, self.settings.screen_width, 2)
         self.add_stones()
 
+        # Background is drawn once into layers, which scroll at different speeds.
+        self.far_layer = ParallaxLayer(self, self._items(FAR), FAR)
+        self.mid_layer = ParallaxLayer(self, self._items(MID), MID)
+        ground_items = [((100, 100, 100), tuple(self.road))] + self._items(CACTUS_SPEED)
+        self.ground_layer = ParallaxLayer(self, ground_items, CACTUS_SPEED)
+        self.layers = (self.far_layer, self.mid_layer, self.ground_layer)
+
+    def _items(self, speed):
+        '''Return scenery of a speed class as pairs of image (or color) and rect tuple.'''
+        return [
+            drawable for drawable, scenery_speed in zip(self.scenery.drawables(), self.scenery.speeds)
+            if scenery_speed == speed
+        ]
+
+    def add_moon(self):
+        '''Add moon.'''
+        variant = variants.image('images/moon.png', 0.5, alpha=100)
+        self.scenery.add_group([(MOON, 700, 75, variant, FAR)])
+
     def add_clouds(self):
         '''Add clouds.'''
-        self.clouds = pygame.sprite.Group()
+        variant = variants.image('images/cloud.png', 0.5, alpha=50)
         distance = 300
         heights = (100, 50, 75)
-        for i, height in enumerate(heights):
-            cloud = Cloud(self)
-            cloud.rect.x += distance * i
-            cloud.rect.y += height
-            self.clouds.add(cloud)
+        self.scenery.add_group(
+            (CLOUD, 50 + distance * i, height, variant, MID) for i, height in enumerate(heights)
+        )
 
     def add_stars(self):
         '''Add stars.'''
-        self.stars = pygame.sprite.Group()
+        variant = variants.image('images/star.png', 0.1, alpha=100)
         distance = 400
         heights = (50, 75)
-        for i, height in enumerate(heights):
-            star = Star(self)
-            star.rect.x += distance * i
-            star.rect.y += height
-            self.stars.add(star)
+        self.scenery.add_group(
+            (STAR, 200 + distance * i, 50 + height, variant, FAR) for i, height in enumerate(heights)
+        )
 
     def add_stones(self):
         '''Add stones.'''
-        self.stones = []
-        distances = accumulate(random.choices(range(20, 51), k=22))
+        stones = []
+        distances = accumulate(self.rng.choices(range(20, 51), k=22))
         heights = range(5, 11)
         stone_widths = range(2, 10)
         stone_heights = (2, 3)
         for distance in distances:
-            stone = Stone(self, random.choice(stone_widths), random.choice(stone_heights))
-            stone.rect.x += distance
-            stone.rect.y += 290 + random.choice(heights)
-            self.stones.append(stone)
+            variant = variants.rect((100, 100, 100), (self.rng.choice(stone_widths), self.rng.choice(stone_heights)))
+            stones.append((STONE, distance, 290 + self.rng.choice(heights), variant, CACTUS_SPEED))
+        self.scenery.add_group(stones)
 
     def update(self):
         '''Update horizontal postion of all background's components.'''
-        self.moon.update()
-        self.clouds.update()
-        self.stars.update()
-        for stone in self.stones:
-            stone.update()
+        for layer in self.layers:
+            layer.scroll(self.settings.speed(layer.speed))
+
+    def drawables(self):
+        '''Return images and rects of background from back to front.'''
+        drawables = []
+        for layer in self.layers:
+            drawables.extend(layer.drawables())
+        return drawables
 
     def draw(self):
         '''Draw background.'''
-        self.stars.draw(self.screen)
-        self.moon.draw()
-        self.clouds.draw(self.screen)
-        pygame.draw.rect(self.screen, (100, 100, 100), self.road)
-        for stone in self.stones:
-            stone.draw()
+        for layer in self.layers:
+            layer.draw()
 
 class Button:
     '''A class to represent button.'''
@@ -686,20 +2178,21 @@ class Button:
         self.width = 96
         self.height = 54
         self.text_color = (100, 100, 100)
-        self.font = self.settings.get_font(size=24)
-        self.secondary_font = self.settings.get_font(size=16)
+        self.atlas = self.settings.get_atlas(size=24, color=self.text_color)
 
         self.prepare_msg('Press space to play')
 
     def prepare_msg(self, msg, submsg=None):
         '''Prepare message to draw.'''
-        self.msg_img = self.font.render(msg, True, self.text_color)
+        self.msg_img = self.atlas.text(msg)
         self.msg_img_rect = self.msg_img.get_rect()
         self.msg_img_rect.center = self.screen_rect.center
 
         # Prepare submessage to draw if given.
         if submsg:
-            self.submsg_img = self.secondary_font.render(submsg, True, self.text_color)
+            # The font of submessages is only loaded when the first one is shown.
+            secondary_atlas = self.settings.get_atlas(size=16, color=self.text_color)
+            self.submsg_img = secondary_atlas.text(submsg)
             self.submsg_img_rect = self.submsg_img.get_rect()
 
             self.msg_img_rect.y -= 30
@@ -714,6 +2207,132 @@ class Button:
         except AttributeError:
             pass
 
+def measure_steps_per_second(steps=100000):
+    '''Run a headless game for a number of steps and return steps per second.
+
+    Trex jumps whenever it can, and the game is restarted each time it is over.
+    Only time spent in step() is counted, restarting is not.
+    '''
+    game = DinoGame(headless=True)
+    game.reset()
+    elapsed = 0
+    for _ in range(steps):
+        start = time.perf_counter()
+        alive = game.step(JUMP)
+        elapsed += time.perf_counter() - start
+        if not alive:
+            game.reset()
+    return steps / elapsed
+
 if __name__ == '__main__':
-    game = DinoGame()
-    game.run_game()
\ No newline at end of file
+    # Modules imported below import dino as well, and must share this one instead of loading
+    # it again with caches of its own.
+    sys.modules['dino'] = sys.modules[__name__]
+
+    parser = argparse.ArgumentParser(description='Play dino game.')
+    parser.add_argument('--benchmark', type=int, metavar='STEPS',
+                        help='simulate STEPS frames headlessly and report steps per second')
+    parser.add_argument('--dirty-rects', action='store_true',
+                        help='redraw and update only the changed parts of the screen')
+    parser.add_argument('--fps', type=int, default=Settings().frame_rate,
+                        help='maximum frames drawn per second, 0 for no limit')
+    parser.add_argument('--window', metavar='WIDTHxHEIGHT', type=lambda size: tuple(map(int, size.split('x'))),
+                        help='show the game scaled to a window of this size')
+    parser.add_argument('--fullscreen', action='store_true', help='show the game scaled to the whole display')
+    parser.add_argument('--scale', choices=('gpu', 'fit', 'integer', 'stretch'), default=Settings().scale_mode,
+                        help='how the game is scaled to the window, see Settings')
+    parser.add_argument('--obstacle-stream', action='store_true',
+                        help='bring obstacles as a stream, several on screen at once')
+    parser.add_argument('--day-night', action='store_true',
+                        help='invert colors from every other milestone on, like night falling')
+    parser.add_argument('--record', metavar='DIR',
+                        help='save a replay of every game played into DIR, see replay.py')
+    parser.add_argument('--build-bundle', action='store_true',
+                        help='pack the images of the game into assets.bundle, which is then used on startup')
+    parser.add_argument('--no-bundle', action='store_true', help='decode images instead of using assets.bundle')
+    parser.add_argument('--time-startup', action='store_true',
+                        help='report the time to the first frame, and exit')
+    parser.add_argument('--profile', action='store_true',
+                        help='show frame times on screen, and a histogram of them on exit')
+    parser.add_argument('--profile-csv', metavar='PATH',
+                        help='write the time of each phase of recent frames to a CSV file on exit')
+    parser.add_argument('--profile-allocations', action='store_true',
+                        help='count the allocations of each phase and source line and time garbage collections, '
+                             'reported on exit')
+    parser.add_argument('--allocation-budget', type=int, metavar='N',
+                        help='with --profile-allocations, report frames making more than N allocations')
+    parser.add_argument('--player', metavar='NAME',
+                        help='keep the score of every game of NAME in a leaderboard, and show the top scores')
+    parser.add_argument('--leaderboard', metavar='PATH', default=ROOT / 'leaderboard.db',
+                        help='SQLite database of the leaderboard, leaderboard.db by default')
+    parser.add_argument('--capture', metavar='DIR', help='save every frame shown as a PNG file in DIR')
+    parser.add_argument('--capture-cmd', metavar='COMMAND',
+                        help='write every frame shown as raw RGB to the input of COMMAND, such as an encoder, '
+                             'with {width} and {height} replaced by the frame size')
+    parser.add_argument('--pipelined', action='store_true',
+                        help='simulate the game in a thread of its own while the main thread draws it')
+    args = parser.parse_args()
+
+    if args.no_bundle or args.build_bundle:
+        assets.bundle = None
+
+    if args.benchmark:
+        print(f'{measure_steps_per_second(args.benchmark):.0f} steps per second')
+    elif args.build_bundle:
+        DinoGame(headless=True)
+        count = assets.save_bundle(ROOT / 'assets.bundle')
+        print(f"packed {count} images into {ROOT / 'assets.bundle'}")
+    elif args.time_startup:
+        start = time.perf_counter()
+        DinoGame()._update_screen()
+        end = time.perf_counter()
+        print(f'first frame after {(end - STARTED) * 1e3:.1f} ms, '
+              f'{(end - start) * 1e3:.1f} ms of it creating the game')
+    else:
+        overrides = {}
+        if args.obstacle_stream:
+            overrides['obstacle_stream'] = True
+        if args.day_night:
+            overrides['day_night'] = True
+        settings = Settings(**overrides)
+        # How the game is shown is left out of the overrides, which replays keep.
+        settings.window_size = args.window
+        settings.fullscreen = args.fullscreen
+        settings.scale_mode = args.scale
+        game = DinoGame(settings=settings)
+        game.settings.dirty_rects = args.dirty_rects
+        game.settings.frame_rate = args.fps
+        if args.record:
+            from replay import Recorder
+            game.recorder = Recorder(args.record)
+        if args.profile_allocations:
+            game.profiler = AllocationProfiler(game, overlay=args.profile, budget=args.allocation_budget)
+        elif args.profile or args.profile_csv:
+            game.profiler = FrameProfiler(game, overlay=args.profile)
+        if args.capture or args.capture_cmd:
+            from capture import Capture
+            game.capture = Capture(game.screen, args.capture, args.capture_cmd)
+        if args.player:
+            from leaderboard import Leaderboard
+            game.leaderboard = Leaderboard(args.leaderboard, args.player)
+            game.scoreboard.load(game.leaderboard)
+        try:
+            if args.pipelined:
+                from pipeline import Pipeline
+                Pipeline(game).run()
+            else:
+                game.run_game()
+        finally:
+            if game.leaderboard:
+                game.leaderboard.close()
+            if game.capture:
+                game.capture.close()
+                print(game.capture.summary())
+            if game.profiler:
+                if args.profile:
+                    print(game.profiler.histogram())
+                if args.profile_csv:
+                    game.profiler.write_csv(args.profile_csv)
+                if args.profile_allocations:
+                    game.profiler.close()
+                    print(game.profiler.report())
@@ -0,0 +1,163 @@
+import numpy as np
+import pygame
+
+from dino import DinoGame, NOOP, JUMP, DUCK, FLYING_LIZARD, variants
+
+# Actions of the environment, by index.
+ACTIONS = (NOOP, JUMP, DUCK)
+
+# Meaning of each value of a feature observation. Positions are in pixels of the screen.
+FEATURES = (
+    'trex_height',         # How far trex is above the ground.
+    'trex_jumping',
+    'trex_ducking',
+    'obstacle_distance',   # From the front of trex to the left of the obstacle.
+    'obstacle_width',
+    'obstacle_top',        # Of the obstacle's rect, above the ground.
+    'obstacle_bottom',
+    'obstacle_flying',
+    'obstacle_speed',      # Pixels per step.
+    'cactus_speed',
+    'flying_lizard_speed',
+)
+
+class DinoEnv:
+    '''A class to play dino game as an environment with a reset and step API like Gym's.
+
+    Observations are either a vector of FEATURES, or the pixels of the screen, optionally
+    in grayscale and downsampled. Both are written into buffers allocated once, so the
+    array returned is the same each step and is overwritten by the next one.
+    '''
+    def __init__(self, observation='features', grayscale=False, downsample=1, settings=None, max_steps=None):
+        '''Initialize environment with a headless game.
+
+        downsample keeps every downsample-th pixel in both directions, and max_steps,
+        if given, ends an episode as truncated after that many steps.
+        '''
+        if observation not in ('features', 'pixels'):
+            raise ValueError(f'unknown observation type {observation!r}')
+        self.observation = observation
+        self.grayscale = grayscale
+        self.downsample = downsample
+        self.max_steps = max_steps
+
+        self.game = DinoGame(headless=True, settings=settings)
+        self.trex = self.game.trex
+        self.ground = self.trex.original_y_pos + self.trex.default_image_rect.height
+        self.steps = 0
+
+        self.features = np.zeros(len(FEATURES), dtype=np.float32)
+
+        # Pixels are kept as rows of columns, like images usually are.
+        height = -(-self.game.screen_rect.height // downsample)
+        width = -(-self.game.screen_rect.width // downsample)
+        if grayscale:
+            self.pixels = np.zeros((height, width), dtype=np.uint8)
+            # Weighted sum of the channels, scaled by 256 to stay in integers.
+            self.weights = (77, 150, 29)
+            self.gray_sum = np.zeros((height, width), dtype=np.uint16)
+            self.gray_channel = np.zeros((height, width), dtype=np.uint16)
+        else:
+            self.pixels = np.zeros((height, width, 3), dtype=np.uint8)
+
+    def reset(self, seed=None):
+        '''Start a new episode, and return its first observation and info.'''
+        self.game.reset(seed)
+        self.steps = 0
+        return self._observe(), self._info()
+
+    def step(self, action):
+        '''Take action, an index of ACTIONS, and return observation, reward, terminated, truncated and info.
+
+        The reward is the score gained in the step.
+        '''
+        score = self.game.scoreboard.score
+        alive = self.game.step(ACTIONS[action])
+        self.steps += 1
+        reward = self.game.scoreboard.score - score
+        truncated = alive and self.max_steps is not None and self.steps >= self.max_steps
+        return self._observe(), reward, not alive, truncated, self._info()
+
+    def _info(self):
+        '''Return extra information about the current state.'''
+        return {'score': self.game.scoreboard.score, 'seed': self.game.seed, 'steps': self.steps}
+
+    def _observe(self):
+        '''Return the observation of the current state.'''
+        if self.observation == 'pixels':
+            return self.observe_pixels()
+        return self.observe_features()
+
+    def observe_features(self):
+        '''Write the features of the current state into the features buffer, and return it.'''
+        trex = self.trex
+        settings = self.game.settings
+        entities = self.game.entities
+        rows = entities.groups[self.game.obstacle]
+        first, last = rows[0], rows[-1]
+        left, top = entities.xs[first], entities.ys[first]
+        flying = entities.kinds[first] == FLYING_LIZARD
+
+        features = self.features
+        features[0] = self.ground - trex.rect.bottom
+        features[1] = trex.jump
+        features[2] = trex.duck
+        features[3] = left - trex.rect.right
+        features[4] = entities.xs[last] + variants.sizes[entities.variants[last]][0] - left
+        features[5] = self.ground - top
+        features[6] = self.ground - top - variants.sizes[entities.variants[first]][1]
+        features[7] = flying
+        features[8] = settings.flying_lizard_speed if flying else settings.cactus_speed
+        features[9] = settings.cactus_speed
+        features[10] = settings.flying_lizard_speed
+        return features
+
+    def observe_pixels(self):
+        '''Draw the current frame, write its pixels into the pixels buffer, and return it.'''
+        screen = self.game.render()
+        # A view of the screen's pixels, which locks the screen until it is deleted.
+        view = pygame.surfarray.pixels3d(screen)
+        # Columns of rows, sliced and transposed without copying.
+        view = view[::self.downsample, ::self.downsample].transpose(1, 0, 2)
+        if self.grayscale:
+            total, channel = self.gray_sum, self.gray_channel
+            np.multiply(view[..., 0], self.weights[0], out=total, dtype=np.uint16)
+            for i in (1, 2):
+                np.multiply(view[..., i], self.weights[i], out=channel, dtype=np.uint16)
+                total += channel
+            np.right_shift(total, 8, out=self.pixels, casting='unsafe')
+        else:
+            # Copying channel by channel is several times faster than all at once,
+            # as the screen holds them in reverse order.
+            for i in range(3):
+                np.copyto(self.pixels[..., i], view[..., i])
+        del view
+        return self.pixels
+
+def measure_steps_per_second(observation='features', steps=10000, seed=0, **options):
+    '''Step an environment with random actions and return steps per second.'''
+    import time
+
+    env = DinoEnv(observation, **options)
+    env.reset(seed)
+    actions = np.random.default_rng(seed).choice(len(ACTIONS), size=steps, p=(0.9, 0.08, 0.02))
+    start = time.perf_counter()
+    for action in actions:
+        _, _, terminated, truncated, _ = env.step(action)
+        if terminated or truncated:
+            env.reset()
+    return steps / (time.perf_counter() - start)
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark the environment with each type of observation.')
+    parser.add_argument('--steps', type=int, default=5000, help='number of steps per measurement')
+    args = parser.parse_args()
+
+    for name, observation, options in (
+        ('features', 'features', {}),
+        ('pixels', 'pixels', {}),
+        ('pixels, gray, 1/4', 'pixels', {'grayscale': True, 'downsample': 4}),
+    ):
+        print(f'{name}: {measure_steps_per_second(observation, args.steps, **options):.0f} steps per second')
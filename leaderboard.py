@@ -0,0 +1,126 @@
+import time
+import queue
+import sqlite3
+import threading
+
+from dino import ROOT
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    player TEXT NOT NULL,
+    score REAL NOT NULL,
+    seed INTEGER,
+    played_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_player_score ON runs (player, score DESC);
+CREATE INDEX IF NOT EXISTS runs_score ON runs (score DESC);
+CREATE INDEX IF NOT EXISTS runs_played_at ON runs (played_at);
+'''
+
+def connect(path):
+    '''Open the database at path in WAL mode, so reading never waits for writing.'''
+    connection = sqlite3.connect(path)
+    connection.execute('PRAGMA journal_mode=WAL')
+    # In WAL mode, a crash can lose the last transactions but never corrupt the database.
+    connection.execute('PRAGMA synchronous=NORMAL')
+    return connection
+
+class Leaderboard:
+    '''A class to keep the score of every game in an SQLite database.
+
+    Scores are queued and written in batches by a thread of their own, so a game
+    over never waits for the disk. The top scores and the player's best are read
+    once when opened, and kept up to date in memory after that.
+    '''
+    def __init__(self, path=ROOT / 'leaderboard.db', player='player', size=10):
+        '''Initialize leaderboard stored at path, of games played by player, keeping size top scores.'''
+        self.path = path
+        self.player = player
+        self.size = size
+
+        self.connection = connect(path)
+        self.connection.executescript(SCHEMA)
+        self.leaders = self.top(size)
+        self.best = self.personal_best(player)
+
+        # Runs waiting to be written, and the error that stopped writing, if any.
+        self.pending = queue.SimpleQueue()
+        self.written = 0
+        self.error = None
+        self.thread = threading.Thread(target=self._write, name='leaderboard', daemon=True)
+        self.thread.start()
+
+    def add(self, score, seed=None):
+        '''Queue the score of a game of the current player, and update the scores in memory.'''
+        played_at = time.time()
+        self.pending.put((self.player, score, seed, played_at))
+        self.best = max(self.best, score)
+        if len(self.leaders) < self.size or score > self.leaders[-1][1]:
+            self.leaders.append((self.player, score, played_at))
+            self.leaders.sort(key=lambda leader: leader[1], reverse=True)
+            del self.leaders[self.size:]
+
+    def top(self, n):
+        '''Return the n highest scores of all players, as tuples of player, score and time played.'''
+        return self.connection.execute(
+            'SELECT player, score, played_at FROM runs ORDER BY score DESC LIMIT ?', (n,)).fetchall()
+
+    def personal_best(self, player):
+        '''Return the highest score of player, or 0.'''
+        row = self.connection.execute('SELECT MAX(score) FROM runs WHERE player = ?', (player,)).fetchone()
+        return row[0] or 0
+
+    def history(self, player, since=0):
+        '''Return the scores of player since a time, oldest first, as pairs of score and time played.'''
+        return self.connection.execute(
+            'SELECT score, played_at FROM runs WHERE played_at >= ? AND player = ? ORDER BY played_at',
+            (since, player)).fetchall()
+
+    def close(self):
+        '''Write the scores still queued, and close the database.'''
+        self.pending.put(None)
+        self.thread.join()
+        self.connection.close()
+
+    def _write(self):
+        '''Write queued runs until closed, all of those waiting in one transaction.'''
+        connection = connect(self.path)
+        closed = False
+        while not closed:
+            runs = [self.pending.get()]
+            while True:
+                try:
+                    runs.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            if runs[-1] is None:
+                runs.pop()
+                closed = True
+            if not runs or self.error:
+                continue
+            try:
+                with connection:
+                    connection.executemany(
+                        'INSERT INTO runs (player, score, seed, played_at) VALUES (?, ?, ?, ?)', runs)
+                self.written += len(runs)
+            except sqlite3.Error as error:
+                self.error = error
+        connection.close()
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Show the top scores of the leaderboard.')
+    parser.add_argument('path', nargs='?', default=ROOT / 'leaderboard.db', help='leaderboard database')
+    parser.add_argument('--top', type=int, default=10, help='number of top scores shown')
+    parser.add_argument('--player', help="also show the player's best score and number of games")
+    args = parser.parse_args()
+
+    leaderboard = Leaderboard(args.path, size=args.top)
+    for rank, (player, score, played_at) in enumerate(leaderboard.leaders, 1):
+        print(f"{rank:3} {player:20} {score:8.0f}  {time.strftime('%Y-%m-%d %H:%M', time.localtime(played_at))}")
+    if args.player:
+        games = len(leaderboard.history(args.player))
+        print(f'{args.player}: best {leaderboard.personal_best(args.player):.0f} in {games} games')
+    leaderboard.close()
@@ -0,0 +1,378 @@
+import os
+import sys
+import json
+import time
+import zlib
+import struct
+import asyncio
+import argparse
+import threading
+
+from dino import DinoGame, Settings, NOOP, DUCK, inverted_images
+from replay import state_hash
+
+# Every datagram starts with the magic and its type, followed by the body of that type.
+MAGIC = b'DRCE'
+HEADER = struct.Struct('<4sB')
+HELLO, INPUTS, DONE = range(3)
+# Own nonce, the other side's nonce as far as known, and checksum of the settings.
+HELLO_BODY = struct.Struct('<QQI')
+# Number of inputs received from the other side, and frame of the first input that follows.
+INPUTS_BODY = struct.Struct('<II')
+# Frames played, final score and state hash of a finished game.
+DONE_BODY = struct.Struct('<IdI')
+
+# Most inputs sent in one datagram, and seconds between sending unacknowledged ones again.
+MAX_INPUTS = 1024
+RESEND_INTERVAL = 0.05
+
+def settings_checksum(settings):
+    '''Return a checksum of the overrides of settings, which both players must share.'''
+    return zlib.crc32(json.dumps(settings.overrides, sort_keys=True, default=str).encode())
+
+class PeerProtocol(asyncio.DatagramProtocol):
+    '''A class to pass the datagrams of the other player to a Peer.'''
+    def __init__(self, peer):
+        '''Initialize protocol of peer.'''
+        self.peer = peer
+
+    def datagram_received(self, data, address):
+        '''Handle a datagram from the other player.'''
+        self.peer._receive(data)
+
+    def error_received(self, error):
+        '''Ignore errors, such as the other player not listening yet, as datagrams are sent again anyway.'''
+
+class Peer:
+    '''A class to exchange the input of each frame with another player over UDP.
+
+    Both sides first agree on a seed, made of a random nonce from each, so their games
+    have the same obstacles. Then each datagram carries every input the other side has not
+    acknowledged yet, so lost ones are sent again. An asyncio event loop runs all of it in
+    a thread of its own, and the game loop never waits on the network.
+    '''
+    def __init__(self, address, peer_address, checksum=0):
+        '''Initialize peer listening on address and sending to peer_address, both pairs of host and port.
+
+        checksum identifies the settings of the game, see settings_checksum.
+        '''
+        self.address = address
+        self.peer_address = peer_address
+        self.checksum = checksum
+
+        self.nonce = int.from_bytes(os.urandom(8), 'little') | 1
+        self.peer_nonce = 0
+        self.seed = None
+        # Set once the seed is agreed on.
+        self.ready = threading.Event()
+        # Reason the race cannot take place, if any.
+        self.error = None
+
+        # Inputs of each frame, by both players, and how many of ours the other side has.
+        self.lock = threading.Lock()
+        self.local_inputs = bytearray()
+        self.remote_inputs = bytearray()
+        self.peer_ack = 0
+        # DONE_BODY values of each player's game, once over.
+        self.done = None
+        self.remote_done = None
+
+        self.loop = None
+        self.transport = None
+        self.closed = None
+        self.started = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='netplay', daemon=True)
+
+    def start(self):
+        '''Start listening and agreeing on a seed, in the background.'''
+        self.thread.start()
+        self.started.wait()
+        if self.error:
+            raise self.error
+
+    def close(self):
+        '''Stop the event loop and close the socket.'''
+        if self.loop:
+            self.loop.call_soon_threadsafe(self.closed.set)
+        self.thread.join()
+
+    def add_input(self, action):
+        '''Send the action of the next frame of the local player.'''
+        with self.lock:
+            self.local_inputs.append(action)
+        self.loop.call_soon_threadsafe(self._send)
+
+    def finish(self, score, state):
+        '''Tell the other player the local game is over, with its final score and state hash.'''
+        with self.lock:
+            self.done = (len(self.local_inputs), score, state)
+        self.loop.call_soon_threadsafe(self._send)
+
+    def receive(self, start):
+        '''Return the inputs of the other player from frame start on, as far as they have arrived.'''
+        with self.lock:
+            return self.remote_inputs[start:]
+
+    def _run(self):
+        '''Run the event loop of the thread.'''
+        asyncio.run(self._serve())
+
+    async def _serve(self):
+        '''Listen, and send datagrams at an interval until closed.'''
+        self.loop = asyncio.get_running_loop()
+        self.closed = asyncio.Event()
+        try:
+            self.transport, _ = await self.loop.create_datagram_endpoint(
+                lambda: PeerProtocol(self), local_addr=self.address, remote_addr=self.peer_address)
+        except OSError as error:
+            self.error = error
+            self.loop = None
+            self.started.set()
+            return
+        self.started.set()
+        try:
+            while not self.closed.is_set():
+                self._send()
+                try:
+                    await asyncio.wait_for(self.closed.wait(), RESEND_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.transport.close()
+
+    def _send(self):
+        '''Send a hello until the seed is agreed on, and then unacknowledged inputs.'''
+        if not self.ready.is_set():
+            self.transport.sendto(HEADER.pack(MAGIC, HELLO) + HELLO_BODY.pack(self.nonce, self.peer_nonce, self.checksum))
+            return
+        with self.lock:
+            first = self.peer_ack
+            body = INPUTS_BODY.pack(len(self.remote_inputs), first)
+            inputs = self.local_inputs[first:first + MAX_INPUTS]
+            done = self.done
+        self.transport.sendto(HEADER.pack(MAGIC, INPUTS) + body + inputs)
+        if done:
+            self.transport.sendto(HEADER.pack(MAGIC, DONE) + DONE_BODY.pack(*done))
+
+    def _receive(self, data):
+        '''Handle a datagram from the other player, ignoring any that is not understood.'''
+        try:
+            magic, kind = HEADER.unpack_from(data)
+            if magic != MAGIC:
+                return
+            if kind == HELLO:
+                nonce, known, checksum = HELLO_BODY.unpack_from(data, HEADER.size)
+                if checksum != self.checksum:
+                    self.error = ValueError('the other player has different settings')
+                    return
+                self.peer_nonce = nonce
+                # The other side has our nonce once it sends it back.
+                if known == self.nonce:
+                    self._agree()
+                self._send()
+            elif kind == INPUTS:
+                # Inputs only come once the other side agreed, so it has our nonce.
+                if self.peer_nonce:
+                    self._agree()
+                ack, first = INPUTS_BODY.unpack_from(data, HEADER.size)
+                inputs = data[HEADER.size + INPUTS_BODY.size:]
+                with self.lock:
+                    self.peer_ack = max(self.peer_ack, ack)
+                    have = len(self.remote_inputs)
+                    if first <= have < first + len(inputs):
+                        self.remote_inputs += inputs[have - first:]
+            elif kind == DONE:
+                self.remote_done = DONE_BODY.unpack_from(data, HEADER.size)
+        except struct.error:
+            pass
+
+    def _agree(self):
+        '''Make the seed out of both nonces, the same way on both sides.'''
+        if not self.ready.is_set():
+            self.seed = (self.nonce ^ self.peer_nonce) & 0xffffffff
+            self.ready.set()
+
+class Ghost:
+    '''A class to race another player, whose trex is simulated from their input and drawn as a ghost.
+
+    The other player's input arrives late, so their game runs ahead on predicted input.
+    When the actual input of a frame turns out different, their game is rolled back to
+    the state before that frame and simulated again, so nothing ever waits for the network.
+    '''
+    def __init__(self, game, peer, max_prediction=30, alpha=96):
+        '''Initialize ghost of game, getting input through peer.
+
+        The other player's game runs at most max_prediction frames ahead of their input,
+        and stops until more of it arrives.
+        '''
+        self.game = game
+        self.peer = peer
+        self.max_prediction = max_prediction
+        self.alpha = alpha
+        self.remote = DinoGame(headless=True, settings=Settings(**game.settings.overrides))
+        # Translucent copies of trex's images, and with day_night their inverted images, made once.
+        trex = self.remote.trex
+        self.images = {}
+        for image in (trex.default_image, trex.duck_image):
+            ghost_image = self.images[image] = image.copy()
+            ghost_image.set_alpha(alpha)
+            if game.settings.day_night:
+                inverted_images.get(ghost_image)
+        self.racing = False
+        self.reset_state()
+
+    def reset_state(self):
+        '''Reset the frames and inputs of the other player's game.'''
+        # Frames to simulate, frames simulated, and frames simulated with actual input.
+        self.target = None
+        self.frame = 0
+        self.confirmed = 0
+        self.inputs = bytearray()
+        # Input predicted for each frame from confirmed on, and the state before it.
+        self.predicted = bytearray()
+        self.states = []
+        self.rollbacks = 0
+        self.resimulated = 0
+
+    def start(self, seed):
+        '''Start the race with seed, in the local game and in the other player's.'''
+        self.reset_state()
+        self.game.reset(seed)
+        self.remote.reset(seed)
+        self.target = 0
+        self.racing = True
+
+    def record(self, action):
+        '''Send the action of the local frame just played, and finish the race once the local game is over.'''
+        if not self.racing:
+            return
+        self.peer.add_input(action)
+        if not self.game.game_active:
+            self.racing = False
+            self.peer.finish(self.game.scoreboard.score, state_hash(self.game))
+
+    def update(self):
+        '''Advance the other player's game by a frame, correcting it with any input that arrived.'''
+        if self.target is None:
+            return
+        self.target += 1
+        self.inputs += self.peer.receive(len(self.inputs))
+        self._correct()
+        self._advance()
+
+    def finished(self):
+        '''Return whether the other player's game is over, and was simulated with all of their input.'''
+        done = self.peer.remote_done
+        return done is not None and len(self.inputs) >= done[0] and self.confirmed >= done[0]
+
+    def result(self):
+        '''Return a line with the score of both players, and whether the other player's game played the same here.'''
+        line = f'your score {self.game.scoreboard.score:.0f}'
+        if not self.finished():
+            return line + ", the other player's game is not over"
+        frames, score, state = self.peer.remote_done
+        line += f", other player's score {score:.0f}"
+        if state_hash(self.remote) != state or self.remote.scoreboard.score != score:
+            line += ', but their game played differently here'
+        return line + f' ({self.rollbacks} rollbacks, {self.resimulated} frames simulated again)'
+
+    def drawables(self):
+        '''Return the other player's trex, as pairs of image and rect like DinoGame._drawables.'''
+        trex = self.remote.trex
+        return [(self.images[trex.image], trex.rect)]
+
+    def _correct(self):
+        '''Roll back to the first frame whose prediction the arrived input proves wrong.'''
+        known = min(len(self.inputs), self.frame)
+        for frame in range(self.confirmed, known):
+            i = frame - self.confirmed
+            if self.predicted[i] != self.inputs[frame]:
+                self.remote.restore(self.states[i])
+                self.rollbacks += 1
+                self.resimulated += self.frame - frame
+                del self.predicted[i:]
+                del self.states[i:]
+                self.frame = known = frame
+                break
+        # States before frames with actual input are no longer needed.
+        del self.predicted[:known - self.confirmed]
+        del self.states[:known - self.confirmed]
+        self.confirmed = known
+
+    def _advance(self):
+        '''Simulate the other player's game up to the target frame, predicting input that has not arrived.'''
+        while self.frame < self.target and self.frame - self.confirmed < self.max_prediction:
+            if self.frame < len(self.inputs):
+                action = self.inputs[self.frame]
+                self.confirmed += 1
+            else:
+                # Ducking lasts as long as the key is held, while a jump is a single press.
+                action = self.inputs[-1] & DUCK if self.inputs else NOOP
+                self.states.append(self.remote.snapshot())
+                self.predicted.append(action)
+            self.remote.step(action)
+            self.frame += 1
+
+def race(game, ghost, bot, rate, timeout):
+    '''Play the local game of a race headlessly with bot at rate steps per second, until both games are over.
+
+    After the local game is over, the other player's game is waited for at most timeout seconds.
+    '''
+    step_time = 1 / rate
+    next_time = time.perf_counter()
+    deadline = None
+    while game.game_active or not ghost.finished():
+        if game.game_active:
+            game.step(bot.act(game))
+        elif deadline is None:
+            deadline = next_time + timeout
+        elif next_time > deadline:
+            break
+        ghost.update()
+        next_time += step_time
+        delay = next_time - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+def parse_address(text):
+    '''Turn "host:port" into a pair of host and port.'''
+    host, port = text.rsplit(':', 1)
+    return host, int(port)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Race another player, showing their trex as a ghost.")
+    parser.add_argument('--listen', type=parse_address, default=('0.0.0.0', 5005), metavar='HOST:PORT',
+                        help='address to receive the other player on')
+    parser.add_argument('--peer', type=parse_address, required=True, metavar='HOST:PORT',
+                        help="the other player's address")
+    parser.add_argument('--bot', action='store_true', help='play headlessly with ReflexBot instead of a window')
+    parser.add_argument('--reaction', type=float, default=1.0, help="scale of the bot's reaction")
+    parser.add_argument('--rate', type=int, default=Settings().sim_rate, help='steps per second of a bot race')
+    parser.add_argument('--timeout', type=float, default=10, help="seconds to wait for the other player's game")
+    args = parser.parse_args()
+
+    game = DinoGame(headless=args.bot)
+    peer = Peer(args.listen, args.peer, settings_checksum(game.settings))
+    peer.start()
+    print(f'waiting for the other player at {args.peer[0]}:{args.peer[1]}')
+    while not peer.ready.wait(0.1):
+        if peer.error:
+            sys.exit(str(peer.error))
+        if not args.bot:
+            import pygame
+            pygame.event.pump()
+
+    ghost = Ghost(game, peer)
+    game.ghost = ghost
+    ghost.start(peer.seed)
+    try:
+        if args.bot:
+            from bots import ReflexBot
+            race(game, ghost, ReflexBot(args.reaction), args.rate, args.timeout)
+        else:
+            game.run_game()
+    finally:
+        # The end of the race is sent a few more times, in case the last ones were lost.
+        time.sleep(RESEND_INTERVAL * 4)
+        peer.close()
+        print(ghost.result())
@@ -0,0 +1,211 @@
+import time
+import threading
+from collections import namedtuple
+
+from dino import NOOP, JUMP, DUCK
+
+# A simulated step of the game: its number, the time it was due, the game it belongs to
+# (see Pipeline.restart) and the RenderState after it.
+Frame = namedtuple('Frame', ('index', 'time', 'generation', 'state'))
+
+# What drawing a step takes, much less than a GameState: whether the game is on, the pose and
+# height of trex, the obstacle groups on screen with the xs of the entities of each,
+# the offsets of the background layers, the scores and the milestone reached.
+RenderState = namedtuple('RenderState', (
+    'game_active', 'trex_ducking_rect', 'trex_duck_image', 'trex_y',
+    'groups', 'xs', 'layer_offsets', 'score', 'high_score', 'milestone_point',
+))
+
+def render_state(game):
+    '''Return the RenderState of game.'''
+    trex = game.trex
+    xs, rows = game.entities.xs, game.entities.groups
+    groups = tuple(game._obstacle_groups())
+    return RenderState(
+        game.game_active, trex.rect is trex.duck_image_rect, trex.image is trex.duck_image, trex.rect.y,
+        groups, tuple(xs[rows[group].start:rows[group].stop] for group in groups),
+        tuple(layer.offset for layer in game.background.layers),
+        game.scoreboard.score, game.scoreboard.high_score, game.settings.milestone_point,
+    )
+
+class Pipeline:
+    '''A class to simulate a game in a thread of its own while the main thread draws it.
+
+    The simulation runs on a headless copy of the game at the fixed simulation rate, and
+    publishes a Frame after each step into one of two slots, the one not being read, then
+    makes it the front slot with a single assignment. The main thread handles events and
+    draws whatever frame is in front, copying just what is drawn into the game it shows,
+    so neither thread ever waits for the other and no lock is taken. Frames are never
+    changed once built, so the one drawn is always a whole step, never part of one and
+    part of the next.
+    '''
+    def __init__(self, game):
+        '''Initialize pipeline simulating game, which is then only drawn.'''
+        if game.ghost:
+            raise ValueError('a race cannot be pipelined')
+        self.game = game
+        # The classes of the game itself, as dino may be loaded as the main module.
+        self.sim = type(game)(headless=True, settings=type(game.settings)(**game.settings.overrides))
+        self.sim.restore(game.snapshot())
+        # Games are recorded as they are played, which is now in the simulation.
+        self.sim.recorder, game.recorder = game.recorder, None
+        self.sim.leaderboard = game.leaderboard
+
+        self.frames = [None, None]
+        self.front = 0
+
+        # Each field is only written by one of the threads: the main thread counts jumps
+        # and requests new games, which the simulation thread takes in its own time.
+        self.jumps = 0
+        self.request = (0, None)
+        self.generation = 0
+
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        '''Start the simulation thread.'''
+        self.running = True
+        self.thread = threading.Thread(target=self._simulate, name='simulation', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        '''Stop the simulation thread.'''
+        self.running = False
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def restart(self, seed):
+        '''Start a new game with seed in the simulation, and ignore frames of the previous one.'''
+        self.generation += 1
+        self.request = (self.generation, seed)
+
+    def latest(self):
+        '''Return the frame most recently published, or None.'''
+        return self.frames[self.front]
+
+    def run(self):
+        '''Run the game, drawing the latest frame of the simulation, until the window is closed.
+
+        Like DinoGame.run_game, each frame shows objects between their positions of the
+        last two simulation steps, by how long ago the last one was due.
+        '''
+        game = self.game
+        step_time = 1 / game.settings.sim_rate
+        profiler = game.profiler
+        shown = None
+        self.start()
+        try:
+            while True:
+                now = time.perf_counter()
+                if profiler:
+                    profiler.begin(now)
+                active = game.game_active
+                game._check_events()
+                if game.game_active and not active:
+                    # The play button reset the game shown, and the simulation follows.
+                    self.restart(game.seed)
+                    shown = None
+                elif game.action & JUMP:
+                    self.jumps += 1
+                game.action &= ~JUMP
+                if profiler:
+                    profiler.mark('events')
+
+                frame = self.latest()
+                if frame is not None and frame is not shown and frame.generation == self.generation:
+                    self._show(frame, shown)
+                    shown = frame
+                if profiler:
+                    profiler.mark('update')
+
+                alpha = (time.perf_counter() - shown.time) / step_time if shown else 1
+                game._update_screen(min(alpha, 1))
+                if profiler:
+                    profiler.mark('draw')
+                game.clock.tick(game.settings.frame_rate)
+                if profiler:
+                    profiler.end()
+        finally:
+            self.stop()
+
+    def _show(self, frame, shown):
+        '''Copy the state of frame into the game shown, which showed the frame shown until now.'''
+        game = self.game
+        # Objects move from where they were in the frame shown, if it was the step before.
+        positions = game._positions() if shown and frame.index == shown.index + 1 else None
+        active = game.game_active
+        self._apply(frame.state)
+        game.positions = positions
+        if active and not game.game_active:
+            game._show_game_over()
+            if game.leaderboard:
+                game.scoreboard.prepare_leaders(game.leaderboard.leaders)
+
+    def _apply(self, state):
+        '''Move the objects of the game shown to where they are in a RenderState.'''
+        game = self.game
+        game.game_active = state.game_active
+
+        trex = game.trex
+        trex.rect = trex.duck_image_rect if state.trex_ducking_rect else trex.default_image_rect
+        trex.image = trex.duck_image if state.trex_duck_image else trex.default_image
+        trex.rect.y = state.trex_y
+
+        if game.settings.obstacle_stream:
+            game.active[:] = state.groups
+        else:
+            game.obstacle = state.groups[0]
+        xs, rows = game.entities.xs, game.entities.groups
+        for group, group_xs in zip(state.groups, state.xs):
+            xs[rows[group].start:rows[group].stop] = group_xs
+        for layer, offset in zip(game.background.layers, state.layer_offsets):
+            layer.offset = offset
+
+        scoreboard = game.scoreboard
+        scoreboard.score = state.score
+        scoreboard.high_score = state.high_score
+        scoreboard.prepare_score()
+        scoreboard.prepare_high_score()
+        game.settings.milestone_point = state.milestone_point
+
+    def _publish(self, frame):
+        '''Put frame in the back slot, and bring it to the front.'''
+        back = 1 - self.front
+        self.frames[back] = frame
+        self.front = back
+
+    def _simulate(self):
+        '''Step the simulation at its fixed rate with the player's input, publishing a frame after each step.'''
+        sim = self.sim
+        settings = sim.settings
+        step_time = 1 / settings.sim_rate
+        generation = 0
+        jumps = self.jumps
+        index = 0
+        due = time.perf_counter()
+        while self.running:
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            # Fall behind rather than try to catch up with more than max_sim_steps at once.
+            elif -delay > settings.max_sim_steps * step_time:
+                due = time.perf_counter()
+
+            request = self.request
+            if request[0] != generation:
+                generation = request[0]
+                sim.reset(request[1])
+                jumps = self.jumps
+            elif sim.game_active:
+                pressed = self.jumps
+                action = JUMP if pressed != jumps else NOOP
+                jumps = pressed
+                sim.step(action | (self.game.action & DUCK))
+            else:
+                due += step_time
+                continue
+            self._publish(Frame(index, due, generation, render_state(sim)))
+            index += 1
+            due += step_time
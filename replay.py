@@ -0,0 +1,155 @@
+import sys
+import json
+import zlib
+import struct
+import argparse
+from array import array
+from pathlib import Path
+
+from dino import DinoGame
+
+# File header: magic, version, seed, frames, final score, hash interval, number of hashes
+# and length of the settings, followed by the settings as JSON, the state hashes and
+# the input of each frame packed into 2 bits.
+MAGIC = b'DINO'
+VERSION = 1
+HEADER = struct.Struct('<4sBQIdHII')
+
+def state_hash(game):
+    '''Return a checksum of the state of game that affects how it plays.'''
+    trex = game.trex
+    values = [
+        trex.rect.y, trex.head_rect.y, trex.feet_rect.y, trex.head_duck_rect.y,
+        trex.jump, trex.reached, trex.duck, trex.mod, trex.rect is trex.duck_image_rect,
+        game.obstacles.index(game.obstacle % game.patterns),
+        game.settings.cactus_speed, game.settings.flying_lizard_speed, game.settings.milestone_point,
+    ]
+    if game.settings.obstacle_stream:
+        values.extend(game.active)
+    values.extend(game.entities.xs[i] for group in game._obstacle_groups() for i in game.entities.groups[group])
+    data = struct.pack(f'<{len(values)}i', *values)
+    data += struct.pack('<2d', game.scoreboard.score, game.settings.points)
+    return zlib.crc32(data)
+
+class Replay:
+    '''A class to represent the recorded input of one game.'''
+    def __init__(self, seed, settings, hash_interval=30):
+        '''Initialize an empty replay of a game with seed and settings overrides.'''
+        self.seed = seed
+        self.settings = settings
+        self.hash_interval = hash_interval
+        self.frames = 0
+        self.final_score = 0
+        self.hashes = array('I')
+        self.inputs = bytearray()
+
+    def add(self, action):
+        '''Add the action of the next frame.'''
+        shift = self.frames % 4 * 2
+        if not shift:
+            self.inputs.append(0)
+        self.inputs[-1] |= (action & 3) << shift
+        self.frames += 1
+
+    def actions(self):
+        '''Yield the action of every frame.'''
+        for frame in range(self.frames):
+            yield self.inputs[frame // 4] >> (frame % 4 * 2) & 3
+
+    def save(self, path):
+        '''Write replay to a file.'''
+        settings = json.dumps(self.settings).encode()
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.seed, self.frames, self.final_score,
+                                self.hash_interval, len(self.hashes), len(settings)))
+            f.write(settings)
+            f.write(self.hashes.tobytes())
+            f.write(self.inputs)
+
+    @classmethod
+    def load(cls, path):
+        '''Read replay from a file.'''
+        data = Path(path).read_bytes()
+        magic, version, seed, frames, final_score, hash_interval, hash_count, settings_size = \
+            HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not a replay file of version {VERSION}')
+
+        offset = HEADER.size
+        settings = json.loads(data[offset:offset + settings_size])
+        # JSON turns tuples into lists.
+        settings = {name: tuple(value) if isinstance(value, list) else value for name, value in settings.items()}
+        offset += settings_size
+
+        replay = cls(seed, settings, hash_interval)
+        replay.frames = frames
+        replay.final_score = final_score
+        replay.hashes.frombytes(data[offset:offset + hash_count * replay.hashes.itemsize])
+        offset += hash_count * replay.hashes.itemsize
+        replay.inputs = bytearray(data[offset:])
+        return replay
+
+class Recorder:
+    '''A class to record every game played into a replay file in a directory.'''
+    def __init__(self, directory, hash_interval=30):
+        '''Initialize recorder.'''
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.hash_interval = hash_interval
+        self.replay = None
+        self.paths = []
+
+    def start(self, game):
+        '''Start recording a new game.'''
+        self.replay = Replay(game.seed, dict(game.settings.overrides), self.hash_interval)
+
+    def record(self, game, action):
+        '''Record the action of a frame that has just been played.'''
+        self.replay.add(action)
+        if self.replay.frames % self.hash_interval == 0:
+            self.replay.hashes.append(state_hash(game))
+
+    def finish(self, game):
+        '''Save the replay of the game that is over, and return its path.'''
+        self.replay.final_score = game.scoreboard.score
+        path = self.directory / f'{game.seed:010}-{len(self.paths):04}.dino'
+        self.replay.save(path)
+        self.paths.append(path)
+        self.replay = None
+        return path
+
+def verify(replay, game=None):
+    '''Play replay headlessly, and return None if it matches, or a description of the mismatch.'''
+    if game is None:
+        game = DinoGame(headless=True)
+    game.settings.configure(**replay.settings)
+    game.reset(replay.seed)
+
+    hashes = iter(replay.hashes)
+    for frame, action in enumerate(replay.actions(), 1):
+        if not game.game_active:
+            return f'game over at frame {frame - 1} instead of {replay.frames}'
+        game.step(action)
+        if frame % replay.hash_interval == 0 and next(hashes) != state_hash(game):
+            return f'state differs at frame {frame}'
+
+    if game.game_active:
+        return f'game not over after {replay.frames} frames'
+    if game.scoreboard.score != replay.final_score:
+        return f'score is {game.scoreboard.score} instead of {replay.final_score}'
+    return None
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Verify recorded games by playing them again headlessly.')
+    parser.add_argument('paths', nargs='+', help='replay files')
+    args = parser.parse_args()
+
+    failures = 0
+    for path in args.paths:
+        # Each replay gets a game of its own, so none depends on what was played before it.
+        error = verify(Replay.load(path))
+        if error:
+            failures += 1
+            print(f'{path}: {error}')
+    print(f'{len(args.paths) - failures} of {len(args.paths)} replays verified')
+    sys.exit(1 if failures else 0)
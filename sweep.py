@@ -0,0 +1,146 @@
+import os
+import ast
+import json
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from dino import DinoGame, Settings, NOOP
+from bots import ReflexBot
+
+# Each worker process keeps one headless game, so images are loaded once per process.
+_game = None
+
+def _init_worker():
+    '''Create the game of this worker process.'''
+    global _game
+    _game = DinoGame(headless=True)
+
+def play_games(config, seeds, max_frames):
+    '''Play one game per seed with the given settings, and return their results.
+
+    Each result is a tuple of score, number of frames survived and milestone point reached.
+    '''
+    if _game is None:
+        _init_worker()
+    _game.settings.configure(**config)
+    bot = ReflexBot()
+
+    results = []
+    for seed in seeds:
+        _game.reset(seed)
+        frames = 0
+        while frames < max_frames and _game.game_active:
+            action = bot.act(_game)
+            # Steps where the bot would do nothing are played at once, see DinoGame.fast_forward.
+            if action == NOOP:
+                played = _game.fast_forward(max_frames - frames, bot.margin(_game))
+                if played:
+                    frames += played
+                    continue
+            if not _game.step(action):
+                break
+            frames += 1
+        results.append((_game.scoreboard.score, frames, _game.settings.milestone_point))
+    return results
+
+def percentile(values, q):
+    '''Return the q-th percentile of sorted values, using the nearest rank.'''
+    index = min(len(values) - 1, max(0, round(q / 100 * len(values)) - 1))
+    return values[index]
+
+def summarize(config, results):
+    '''Aggregate the results of all games played with one config.'''
+    scores = sorted(result[0] for result in results)
+    milestones = Settings(**config).milestones
+    summary = {
+        'config': config,
+        'games': len(results),
+        'mean_score': sum(scores) / len(scores),
+        'p50_score': percentile(scores, 50),
+        'p90_score': percentile(scores, 90),
+        'p99_score': percentile(scores, 99),
+        'max_score': scores[-1],
+        'mean_frames': sum(result[1] for result in results) / len(results),
+    }
+    # Share of games that reached each milestone.
+    summary['milestones_reached'] = {
+        str(milestone): sum(result[2] > i for result in results) / len(results)
+        for i, milestone in enumerate(milestones[:-1])
+    }
+    return summary
+
+def run_sweep(configs, seeds, max_frames=20000, workers=None, chunk_size=16, progress=None):
+    '''Play every seed with every config across a pool of processes, and return summaries.
+
+    progress, if given, is called with the number of finished and total games whenever
+    a chunk of results comes back.
+    '''
+    chunks = [
+        (i, seeds[start:start + chunk_size])
+        for i in range(len(configs))
+        for start in range(0, len(seeds), chunk_size)
+    ]
+    results = [[] for _ in configs]
+    total = len(configs) * len(seeds)
+    finished = 0
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        futures = {
+            executor.submit(play_games, configs[i], chunk, max_frames): i
+            for i, chunk in chunks
+        }
+        for future in as_completed(futures):
+            chunk_results = future.result()
+            results[futures[future]].extend(chunk_results)
+            finished += len(chunk_results)
+            if progress:
+                progress(finished, total)
+
+    return [summarize(config, config_results) for config, config_results in zip(configs, results)]
+
+def parse_grid(assignments):
+    '''Turn assignments like "speedup_scale=1.1,1.2" into a list of setting configs.
+
+    A value with colons, such as "milestones=100:300:1000", is read as a tuple.
+    '''
+    names, choices = [], []
+    for assignment in assignments:
+        name, values = assignment.split('=', 1)
+        parsed = []
+        for value in values.split(','):
+            if ':' in value:
+                value = tuple(ast.literal_eval(part) for part in value.split(':'))
+                if name == 'milestones' and value[-1] != float('inf'):
+                    value += (float('inf'),)
+            else:
+                value = ast.literal_eval(value)
+            parsed.append(value)
+        names.append(name)
+        choices.append(parsed)
+    return [dict(zip(names, values)) for values in itertools.product(*choices)]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Play many headless games for each combination of settings.')
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=V1,V2',
+                        help='values of a setting to sweep, may be given more than once')
+    parser.add_argument('--seeds', type=int, default=100, help='number of games per config')
+    parser.add_argument('--max-frames', type=int, default=20000, help='frame limit of one game')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='number of worker processes')
+    parser.add_argument('--chunk-size', type=int, default=16, help='games per task sent to a worker')
+    parser.add_argument('--json', metavar='PATH', help='also write the summaries to a JSON file')
+    args = parser.parse_args()
+
+    def show_progress(finished, total):
+        print(f'\r{finished}/{total} games', end='', flush=True)
+
+    summaries = run_sweep(parse_grid(args.set), list(range(args.seeds)), args.max_frames,
+                          args.workers, args.chunk_size, show_progress)
+    print()
+    for summary in summaries:
+        print(f"{summary['config']}: mean {summary['mean_score']:.0f}, p50 {summary['p50_score']:.0f}, "
+              f"p99 {summary['p99_score']:.0f}, milestones {summary['milestones_reached']}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summaries, f, indent=2, default=str)
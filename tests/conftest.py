@@ -0,0 +1,7 @@
+import os
+import sys
+from pathlib import Path
+
+# Tests import the game's modules from the repository root, and never open a real window.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
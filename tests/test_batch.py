@@ -0,0 +1,43 @@
+import numpy as np
+
+from dino import DinoGame, NOOP, JUMP, DUCK
+from batch import BatchDinoGame
+
+def test_batch_plays_like_dino_games():
+    num_games = 16
+    batch = BatchDinoGame(num_games, seed=0)
+    games = [DinoGame(headless=True) for _ in range(num_games)]
+    # The batch chooses obstacles with a generator of its own, so each game is given its choices.
+    groups = batch.groups
+    for i, game in enumerate(games):
+        game.reset(i)
+        game.obstacle = groups[batch.obstacle[i]]
+
+    rng = np.random.default_rng(0)
+    finished = 0
+    for _ in range(2000):
+        actions = rng.choice((NOOP, JUMP, DUCK, JUMP | DUCK), size=num_games, p=(0.8, 0.1, 0.05, 0.05))
+        xs = [game.entities.xs[game.entities.groups[game.obstacle].start] for game in games]
+        alive = [game.step(int(action)) for game, action in zip(games, actions)]
+        over = batch.step(actions)
+        for i, game in enumerate(games):
+            assert over[i] == (not alive[i])
+            if over[i]:
+                assert batch.final_score[i] == game.scoreboard.score
+                finished += 1
+                game.reset(i)
+                game.obstacle = groups[batch.obstacle[i]]
+                continue
+            # An obstacle moved back to the right was replaced, maybe by itself.
+            if game.entities.xs[game.entities.groups[game.obstacle].start] > xs[i]:
+                game.obstacle = groups[batch.obstacle[i]]
+
+            trex = game.trex
+            ducking = trex.rect is trex.duck_image_rect
+            assert ducking == batch.rect_duck[i]
+            assert trex.rect.y == (batch.duck_y[i] if ducking else batch.default_y[i])
+            assert trex.head_duck_rect.y == batch.head_duck_y[i]
+            assert (trex.jump, trex.reached, trex.mod) == (batch.jump[i], batch.reached[i], batch.mod[i])
+            assert game.entities.xs[game.entities.groups[game.obstacle].start] == batch.obstacle_x[i]
+            assert game.scoreboard.score == batch.score[i]
+    assert finished >= num_games
@@ -0,0 +1,30 @@
+import pytest
+
+from dino import DinoGame, Settings, NOOP
+from bots import ReflexBot
+from replay import state_hash
+
+@pytest.fixture(params=[False, True], ids=['classic', 'stream'])
+def settings(request):
+    return Settings(obstacle_stream=True) if request.param else Settings()
+
+def test_fast_forward_plays_like_steps(settings):
+    forward = DinoGame(headless=True, settings=settings)
+    stepped = DinoGame(headless=True, settings=Settings(**settings.overrides))
+    bot = ReflexBot()
+    fast_forwarded = 0
+    for seed in range(5):
+        forward.reset(seed)
+        stepped.reset(seed)
+        while forward.game_active:
+            action = bot.act(forward)
+            played = forward.fast_forward(100, bot.margin(forward)) if action == NOOP else 0
+            for _ in range(played):
+                stepped.step(NOOP)
+            if not played:
+                forward.step(action)
+                stepped.step(action)
+            fast_forwarded += played > 1
+            assert state_hash(forward) == state_hash(stepped)
+            assert forward.game_active == stepped.game_active
+    assert fast_forwarded
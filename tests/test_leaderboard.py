@@ -0,0 +1,30 @@
+from dino import DinoGame, Settings, NOOP
+from bots import LookaheadBot
+from leaderboard import Leaderboard
+
+def test_lookahead_rollouts_add_no_scores(tmp_path):
+    game = DinoGame(headless=True)
+    game.leaderboard = Leaderboard(tmp_path / 'leaderboard.db')
+    bot = LookaheadBot(horizon=5)
+    games = 0
+    for seed in range(3):
+        game.reset(seed)
+        for _ in range(400):
+            if not game.step(bot.act(game)):
+                break
+        # Games the bot survives are ended by hand, so every one of them counts.
+        while game.step(NOOP):
+            pass
+        games += 1
+    game.leaderboard.close()
+
+    assert bot.rollouts > games
+    leaderboard = Leaderboard(tmp_path / 'leaderboard.db', size=100)
+    assert len(leaderboard.leaders) == games
+    leaderboard.close()
+
+def test_leader_lines_are_not_kept_forever():
+    atlas = Settings().get_atlas(size=16, color=(100, 100, 100))
+    for score in range(1000):
+        atlas.text(f' 1 player       {score:05}')
+    assert len(atlas.texts) <= atlas.max_texts
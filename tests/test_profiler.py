@@ -0,0 +1,17 @@
+import tracemalloc
+
+from dino import DinoGame, Settings, AllocationProfiler
+
+def test_closing_leaves_tracing_started_by_the_caller_on():
+    game = DinoGame(settings=Settings())
+    tracemalloc.start()
+    try:
+        AllocationProfiler(game).close()
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+    profiler = AllocationProfiler(game)
+    assert tracemalloc.is_tracing()
+    profiler.close()
+    assert not tracemalloc.is_tracing()
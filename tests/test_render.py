@@ -0,0 +1,81 @@
+import random
+
+import pygame
+
+from dino import DinoGame, Settings, FrameProfiler, InvertedImages, NOOP, JUMP, DUCK
+from netplay import Ghost
+from bots import ReflexBot
+
+def test_dirty_rects_draw_the_same_as_full_redraws():
+    game = DinoGame(settings=Settings())
+    game.settings.dirty_rects = True
+    rng = random.Random(0)
+    action = NOOP
+    differing = 0
+    for seed in range(3):
+        game.reset(seed)
+        while game.game_active:
+            # Jumps, with ducking held for a while both on the ground and in the air.
+            if rng.random() < 0.1:
+                action = rng.choice((NOOP, JUMP, DUCK, JUMP | DUCK))
+            game.positions = game._positions()
+            game.step(action)
+            action &= ~JUMP
+            for alpha in (0.5, 1):
+                game._update_screen(alpha)
+                dirty = game.screen.copy()
+                game.settings.dirty_rects = False
+                game._update_screen(alpha)
+                game.settings.dirty_rects = True
+                if pygame.image.tobytes(dirty, 'RGB') != pygame.image.tobytes(game.screen, 'RGB'):
+                    differing += 1
+                # Dirty rect rendering carries on from what it drew itself.
+                game.screen.blit(dirty, (0, 0))
+    assert differing == 0
+
+def test_dirty_rects_draw_the_same_with_several_steps_per_frame():
+    game = DinoGame(settings=Settings())
+    game.settings.dirty_rects = True
+    bot = ReflexBot()
+    differing = 0
+    for steps in (2, 3):
+        game.reset(steps)
+        # Scores are composed once per step, more than once between frames, past milestones too.
+        while game.game_active and game.scoreboard.score < 600:
+            for _ in range(steps):
+                game.step(bot.act(game))
+            game._update_screen()
+            dirty = game.screen.copy()
+            game.settings.dirty_rects = False
+            game._update_screen()
+            game.settings.dirty_rects = True
+            if pygame.image.tobytes(dirty, 'RGB') != pygame.image.tobytes(game.screen, 'RGB'):
+                differing += 1
+            game.screen.blit(dirty, (0, 0))
+    assert game.scoreboard.high_score > 400
+    assert differing == 0
+
+def test_night_frames_invert_no_image_while_playing(monkeypatch):
+    game = DinoGame(settings=Settings(day_night=True))
+    game.profiler = FrameProfiler(game, overlay=True)
+    ghost = Ghost(game, peer=None)
+    game.settings.milestone_point = 1
+    game.fade_frame = game.settings.fade_frames
+
+    inverted = []
+    invert = InvertedImages._invert
+    monkeypatch.setattr(InvertedImages, '_invert', staticmethod(lambda image: inverted.append(image) or invert(image)))
+    for dirty_rects in (False, True):
+        game.settings.dirty_rects = dirty_rects
+        for seed in range(2):
+            game.reset(seed)
+            while game.step(JUMP if seed else NOOP):
+                game.settings.milestone_point = 1
+                # The ghost is only drawn, as there is no other player to send input to.
+                game.ghost = ghost
+                game._update_screen()
+                game.ghost = None
+                game.profiler.prepare_overlay()
+            game.scoreboard.prepare_leaders([('player', game.scoreboard.score, 0), ('other', seed, 0)])
+            game._update_screen()
+    assert inverted == []
@@ -0,0 +1,38 @@
+from dino import DinoGame, NOOP, JUMP, DUCK
+from replay import Recorder, Replay, verify
+
+def die_ducking_midair(game, seed):
+    '''Play a game with seed that ends while trex is ducking in the air, and return whether it did.'''
+    for start in range(200):
+        game.reset(seed)
+        for _ in range(start):
+            game.step(NOOP)
+        if not game.game_active:
+            return False
+        # Duck on the ground first, then jump and keep ducking until the game is over.
+        game.step(DUCK)
+        game.step(JUMP | DUCK)
+        while game.game_active and game.trex.jump:
+            game.step(DUCK)
+        if not game.game_active and game.trex.jump:
+            return True
+    return False
+
+def test_replays_after_dying_ducking_midair_verify(tmp_path):
+    game = DinoGame(headless=True)
+    game.recorder = Recorder(tmp_path)
+    assert die_ducking_midair(game, 0)
+
+    # The next game ducks all along, so its duck hit box must start where it belongs.
+    game.reset(1)
+    for _ in range(300):
+        if not game.step(DUCK):
+            break
+    game.step(JUMP)
+    while game.game_active:
+        game.step(NOOP)
+
+    replays = [Replay.load(path) for path in game.recorder.paths]
+    assert len(replays) >= 2
+    for replay in replays:
+        assert verify(replay) is None
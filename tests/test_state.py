@@ -0,0 +1,30 @@
+import random
+
+import pytest
+
+from dino import DinoGame, Settings, NOOP, JUMP, DUCK
+from replay import state_hash
+
+@pytest.fixture(params=[False, True], ids=['classic', 'stream'])
+def settings(request):
+    return Settings(obstacle_stream=True) if request.param else Settings()
+
+def test_restore_then_step_plays_the_same(settings):
+    game = DinoGame(headless=True, settings=settings)
+    other = DinoGame(headless=True, settings=Settings(**settings.overrides))
+    rng = random.Random(0)
+    for seed in range(3):
+        game.reset(seed)
+        while game.game_active:
+            action = rng.choice((NOOP, NOOP, NOOP, JUMP, DUCK))
+            state = game.snapshot()
+            game.step(action)
+            expected = state_hash(game), game.game_active
+
+            # Stepping again from the state restored, in the same game and in another one.
+            game.restore(state)
+            game.step(action)
+            other.restore(state)
+            other.step(action)
+            assert (state_hash(game), game.game_active) == expected
+            assert (state_hash(other), other.game_active) == expected